@@ -0,0 +1,58 @@
+"""
+Micro-benchmark of the KairosDB client against the local mock server.
+
+    original   what the operator did: a new session per call, the query logged at INFO,
+               the response decoded twice (once only for a DEBUG message)
+    client     KairosDBClient: shared keep-alive session, gzip responses, a single decode
+
+Usage: python bench_client.py --requests 50 --hours 24 --interval 1000
+"""
+import argparse
+import json
+import logging
+import time
+
+import requests
+
+from kairosdb_client import KairosDBClient, QUERY_ENDPOINT
+from mock_kairosdb import MockKairosDB
+
+
+def original_call(url, query):
+    data = json.dumps(query)
+    headers = {'Content-Type': 'application/json'}
+    logging.info("Performing HTTP REST call... (method: POST, endpoint: " + QUERY_ENDPOINT + ", data: " + str(data) + ", headers: " + str(headers) + ")")
+    session = requests.Session()
+    response = session.post(url + QUERY_ENDPOINT, data=data, headers=headers)
+    logging.debug("response_as_json: " + str(response.json()))
+    return response.json().get('queries')
+
+
+def bench(name, call, requests_count):
+    start = time.perf_counter()
+    for _ in range(requests_count):
+        call()
+    elapsed = time.perf_counter() - start
+    print('%-10s %8.1f ms/request %8.1f requests/s' % (name, 1000 * elapsed / requests_count, requests_count / elapsed))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--hours', type=int, default=24, help='time range of the query')
+    parser.add_argument('--interval', type=int, default=1000, help='milliseconds between two points')
+    args = parser.parse_args()
+    # the INFO level of an Airflow task log
+    logging.basicConfig(level=logging.INFO, filename='/dev/null')
+
+    start = 1530000000000
+    query = {'metrics': [{'name': 'device0.my.measure.temperature', 'tags': {}}],
+             'start_absolute': start, 'end_absolute': start + args.hours * 3600 * 1000}
+    with MockKairosDB(interval=args.interval) as kairosdb:
+        points = len(original_call(kairosdb.url, query)[0]['results'][0]['values'])
+        print('%d points per request' % points)
+        bench('original', lambda: original_call(kairosdb.url, query), args.requests)
+        connections = kairosdb.connections
+        client = KairosDBClient(kairosdb.url)
+        bench('client', lambda: client.query(query), args.requests)
+        print('connections: original %d, client %d' % (connections - 1, kairosdb.connections - connections))
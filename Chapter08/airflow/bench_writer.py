@@ -0,0 +1,65 @@
+"""
+Points/sec of the bulk writer against the local mock server (or a real KairosDB/OpenTSDB with --url).
+
+    per-point   one POST per point, as the ad hoc calls did
+    writer      DatapointWriter, for every batch size and concurrency
+
+Usage: python bench_writer.py --points 200000 --batch-size 1000 5000 --workers 1 4 --protocol kairosdb
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import requests
+
+from kairosdb_writer import DatapointWriter, ENDPOINTS
+from mock_kairosdb import MockKairosDB
+
+
+def per_point(url, protocol, timestamps, values):
+    session = requests.Session()
+    for t, v in zip(timestamps.tolist(), values.tolist()):
+        if protocol == 'kairosdb':
+            body = [{'name': 'bench.per_point', 'datapoints': [[t, v]], 'tags': {'host': 'bench'}}]
+        else:
+            body = [{'metric': 'bench.per_point', 'timestamp': t, 'value': v, 'tags': {'host': 'bench'}}]
+        session.post(url + ENDPOINTS[protocol], data=json.dumps(body),
+                     headers={'Content-Type': 'application/json'}).raise_for_status()
+
+
+def run(url, args):
+    rnd = np.random.RandomState(0)
+    timestamps = 1530000000000 + 1000 * np.arange(args.points)
+    values = rnd.rand(args.points)
+
+    n = min(args.points, 2000)
+    start = time.perf_counter()
+    per_point(url, args.protocol, timestamps[:n], values[:n])
+    print('%-10s %8d points %12.0f points/s' % ('per-point', n, n / (time.perf_counter() - start)))
+
+    for batch_size in args.batch_size:
+        for workers in args.workers:
+            with DatapointWriter(url, args.protocol, batch_size=batch_size, max_workers=workers,
+                                 compress=not args.no_gzip) as writer:
+                writer.add_series('bench.writer', timestamps, values, {'host': 'bench'})
+            stats = writer.stats()
+            print('%-10s %8d points batch=%-6d workers=%-3d %12.0f points/s' %
+                  ('writer', stats['points'], batch_size, workers, stats['points_per_sec']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', type=str, default=None, help='KairosDB/OpenTSDB URL, the mock server if not set')
+    parser.add_argument('--protocol', choices=sorted(ENDPOINTS), default='kairosdb')
+    parser.add_argument('--points', type=int, default=200000)
+    parser.add_argument('--batch-size', nargs='+', type=int, default=[1000, 5000])
+    parser.add_argument('--workers', nargs='+', type=int, default=[1, 4])
+    parser.add_argument('--no-gzip', action='store_true')
+    args = parser.parse_args()
+
+    if args.url:
+        run(args.url, args)
+    else:
+        with MockKairosDB() as kairosdb:
+            run(kairosdb.url, args)
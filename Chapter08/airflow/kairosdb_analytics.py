@@ -0,0 +1,101 @@
+"""
+Analytics of the KairosDB results for the DAGs: statistics and rollups on numpy arrays, one pair
+(timestamps, values) per metric, from a KairosDB response or from the files of kairosdb_store.py.
+"""
+import copy
+
+import numpy as np
+
+from kairosdb_client import time_range
+import kairosdb_store
+
+# reductions of rollup(), all of them ufuncs usable with reduceat
+REDUCTIONS = {'sum': np.add, 'min': np.minimum, 'max': np.maximum}
+
+
+def to_arrays(queries):
+    """{metric name: (timestamps, values)} of the 'queries' of a KairosDB response.
+    timestamps are int64 epoch milliseconds, values float64; the results of a metric
+    split by group_by are concatenated."""
+    arrays = {}
+    for q in queries:
+        for result in q.get('results', []):
+            points = np.array(result.get('values', []), dtype=np.float64).reshape(-1, 2)
+            timestamps = points[:, 0].astype(np.int64)
+            values = points[:, 1].copy()
+            if result['name'] in arrays:
+                t, v = arrays[result['name']]
+                timestamps = np.concatenate((t, timestamps))
+                values = np.concatenate((v, values))
+            arrays[result['name']] = (timestamps, values)
+    return arrays
+
+
+def arrays_of(data):
+    """{metric name: (timestamps, values)} of the result of the KairosDB operator: the 'queries'
+    of the response or the reference to the local files."""
+    if kairosdb_store.is_reference(data):
+        return kairosdb_store.load_arrays(data)
+    return to_arrays(data)
+
+
+def summarize(values, percentiles=(5, 50, 95)):
+    """count, mean, std, min, max and the percentiles of an array of values."""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return {'count': 0}
+    summary = {'count': int(len(values)),
+               'mean': float(values.mean()),
+               'std': float(values.std()),
+               'min': float(values.min()),
+               'max': float(values.max())}
+    if percentiles:
+        for p, v in zip(percentiles, np.percentile(values, percentiles)):
+            summary['p%g' % p] = float(v)
+    return summary
+
+
+def summarize_queries(data, percentiles=(5, 50, 95)):
+    """{metric name: summary} of the result of the KairosDB operator."""
+    return dict((name, summarize(values, percentiles)) for name, (_, values) in arrays_of(data).items())
+
+
+def means(data):
+    """{metric name: mean of the values} of the result of the KairosDB operator."""
+    return dict((name, float(values.mean())) for name, (_, values) in arrays_of(data).items() if len(values))
+
+
+def rollup(timestamps, values, bucket, how='mean'):
+    """Values aggregated by time buckets of bucket milliseconds (aligned to the epoch).
+    how is mean, sum, min, max or count. Returns (start of the buckets, aggregates),
+    only the buckets with points; timestamps must be sorted."""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    if len(timestamps) == 0:
+        return timestamps, values
+    buckets = timestamps // bucket
+    # first point of every bucket
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    counts = np.diff(np.r_[starts, len(values)])
+    if how == 'count':
+        aggregates = counts.astype(np.float64)
+    elif how == 'mean':
+        aggregates = np.add.reduceat(values, starts) / counts
+    else:
+        aggregates = REDUCTIONS[how].reduceat(values, starts)
+    return buckets[starts] * bucket, aggregates
+
+
+def pushdown(query, aggregator='avg', sampling=None, now=None):
+    """A copy of query with the aggregator (avg, min, max, sum, count, ...) added to every metric.
+    sampling is a KairosDB relative time such as {"value": "1", "unit": "hours"}; if None the whole
+    time range of the query is a single sample, i.e. one point per metric."""
+    query = copy.deepcopy(query)
+    if sampling is None and 'start_relative' in query and 'end_absolute' not in query:
+        sampling = dict(query['start_relative'])
+    elif sampling is None:
+        start, end = time_range(query, now)
+        sampling = {'value': str(end - start + 1), 'unit': 'milliseconds'}
+    for metric in query['metrics']:
+        metric.setdefault('aggregators', []).append({'name': aggregator, 'sampling': sampling})
+    return query
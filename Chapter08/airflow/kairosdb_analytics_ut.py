@@ -0,0 +1,55 @@
+import unittest
+
+import numpy as np
+
+from kairosdb_analytics import to_arrays, summarize, means, rollup, pushdown
+from kairosdb_client import KairosDBClient
+from mock_kairosdb import MockKairosDB
+
+HOUR = 3600 * 1000
+
+
+def python_mean(queries):
+    # the mean of the original DAG
+    ret = {}
+    for d in queries:
+        for r in d['results']:
+            m = [float(sum(l))/len(l) for l in zip(*r['values'])]
+            ret[r['name']] = m[1]
+    return ret
+
+
+class MyTest(unittest.TestCase):
+    def setUp(self):
+        self.queries = [{'sample_size': 4, 'results': [{'name': 'a', 'values': [[0, 1.0], [1000, 2.0], [HOUR, 4.0], [HOUR + 1, 5.0]]}]},
+                        {'sample_size': 0, 'results': [{'name': 'b', 'values': []}]}]
+
+    def test_arrays(self):
+        timestamps, values = to_arrays(self.queries)['a']
+        self.assertEqual(timestamps.dtype, np.int64)
+        np.testing.assert_array_equal(values, [1, 2, 4, 5])
+        self.assertEqual(means(self.queries), {'a': 3.0})
+        summary = summarize(values, percentiles=(50,))
+        self.assertEqual((summary['count'], summary['min'], summary['max'], summary['p50']), (4, 1.0, 5.0, 3.0))
+
+    def test_rollup(self):
+        timestamps, values = to_arrays(self.queries)['a']
+        buckets, m = rollup(timestamps, values, HOUR)
+        np.testing.assert_array_equal(buckets, [0, HOUR])
+        np.testing.assert_array_equal(m, [1.5, 4.5])
+        np.testing.assert_array_equal(rollup(timestamps, values, HOUR, 'max')[1], [2, 5])
+        np.testing.assert_array_equal(rollup(timestamps, values, HOUR, 'count')[1], [2, 2])
+
+    def test_pushdown(self):
+        query = {'metrics': [{'name': 'device0.my.measure.temperature', 'tags': {}}],
+                 'start_absolute': 1530000000000, 'end_absolute': 1530000000000 + 24 * HOUR}
+        with MockKairosDB(interval=60 * 1000) as kairosdb:
+            client = KairosDBClient(kairosdb.url)
+            raw = client.query(query)
+            reduced = client.query(pushdown(query, 'avg'))
+        self.assertEqual(len(reduced[0]['results'][0]['values']), 1)
+        self.assertAlmostEqual(means(reduced)['device0.my.measure.temperature'], means(raw)['device0.my.measure.temperature'])
+        self.assertAlmostEqual(means(raw)['device0.my.measure.temperature'], python_mean(raw)['device0.my.measure.temperature'])
+
+if __name__ == '__main__':
+    unittest.main()
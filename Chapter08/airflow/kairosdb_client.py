@@ -0,0 +1,207 @@
+"""
+Client of the KairosDB REST API used by the KairosDB operator.
+
+A long query is split in time windows, every metric of every window asked with its own request
+over a pooled session, and the results merged back in time order. The metrics with a limit, a
+descending order or an aggregator over a range of points are asked with a single request.
+"""
+import copy
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+QUERY_ENDPOINT = '/api/v1/datapoints/query'
+
+# milliseconds of the time units of KairosDB (months and years as 30 and 365 days)
+UNITS = {'milliseconds': 1,
+         'seconds': 1000,
+         'minutes': 60 * 1000,
+         'hours': 3600 * 1000,
+         'days': 86400 * 1000,
+         'weeks': 7 * 86400 * 1000,
+         'months': 30 * 86400 * 1000,
+         'years': 365 * 86400 * 1000}
+
+
+def to_milliseconds(duration):
+    """Milliseconds of a duration: a number of milliseconds or a KairosDB relative time
+    such as {"value": "1", "unit": "days"}."""
+    if isinstance(duration, dict):
+        return int(float(duration['value']) * UNITS[duration['unit'].lower()])
+    return int(duration)
+
+
+def time_range(query, now=None):
+    """(start, end) in epoch milliseconds of a query with absolute or relative times."""
+    if now is None:
+        now = int(time.time() * 1000)
+    if 'start_absolute' in query:
+        start = int(query['start_absolute'])
+    else:
+        start = now - to_milliseconds(query['start_relative'])
+    if 'end_absolute' in query:
+        end = int(query['end_absolute'])
+    elif 'end_relative' in query:
+        end = now - to_milliseconds(query['end_relative'])
+    else:
+        end = now
+    return start, end
+
+
+def split_windows(start, end, window):
+    """Consecutive (start, end) windows of window milliseconds covering [start, end], bounds included."""
+    windows = []
+    while start <= end:
+        windows.append((start, min(start + window - 1, end)))
+        start += window
+    return windows
+
+
+# aggregators that transform every point on its own, the others aggregate a range of points
+POINTWISE_AGGREGATORS = ('scale', 'div', 'filter')
+
+
+def windowable(metric):
+    """True if the result of the metric is the same asked at once or by windows."""
+    if 'limit' in metric or metric.get('order', 'asc') != 'asc':
+        return False
+    return all(a.get('name') in POINTWISE_AGGREGATORS for a in metric.get('aggregators', []))
+
+
+def window_queries(query, window=None, now=None):
+    """The sub-queries of query, one per window and metric, as a list (one item per metric)
+    of lists (one item per window). The metrics that are not windowable get a single sub-query."""
+    start, end = time_range(query, now)
+    windows = split_windows(start, end, to_milliseconds(window)) if window else [(start, end)]
+    base = dict((k, v) for k, v in query.items()
+                if k not in ('metrics', 'start_relative', 'end_relative', 'start_absolute', 'end_absolute'))
+    queries = []
+    for metric in query['metrics']:
+        per_metric = []
+        if len(windows) > 1 and not windowable(metric):
+            logging.info("Metric %s asked without windows: limit, order or range aggregators", metric.get('name'))
+        for s, e in (windows if windowable(metric) else [(start, end)]):
+            q = copy.deepcopy(base)
+            q.update({'start_absolute': s, 'end_absolute': e, 'metrics': [metric]})
+            per_metric.append(q)
+        queries.append(per_metric)
+    return queries
+
+
+def loads(body):
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body.decode('utf-8'))
+
+
+def _group_key(result):
+    return json.dumps([result.get('name'), result.get('group_by'), result.get('tags')], sort_keys=True)
+
+
+def merge_queries(windows):
+    """Merge the 'queries' items of the windows of a metric (an iterable, in time order) into one item."""
+    merged = {'sample_size': 0, 'results': []}
+    groups = {}
+    for q in windows:
+        merged['sample_size'] += q.get('sample_size', 0)
+        for result in q.get('results', []):
+            key = _group_key(result)
+            if key not in groups:
+                groups[key] = dict(result, values=[])
+                merged['results'].append(groups[key])
+            groups[key]['values'].extend(result.get('values', []))
+    return merged
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def shared_client(key, factory):
+    """The client of key, created by factory() the first time it is asked by this process.
+    key must hold every setting of the client built by factory (e.g. the pool size): a later
+    caller with other settings would get the client of the first one.
+    The process id is part of the key: a forked process never reuses the connections of its parent."""
+    key = (os.getpid(), key)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = factory()
+    return client
+
+
+class KairosDBClient(object):
+    """
+    :param base_url: URL of KairosDB, e.g. http://localhost:8080
+    :param session: the requests session to use (e.g. the one of an Airflow HttpHook), a new one if None
+    :param pool_size: connections kept alive to KairosDB, at least the number of concurrent requests
+    :param compress: gzip the body of the requests
+    """
+
+    def __init__(self, base_url, session=None, pool_size=8, timeout=300, compress=False):
+        self.base_url = base_url.rstrip('/')
+        self.session = session if session is not None else requests.Session()
+        self.timeout = timeout
+        self.compress = compress
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def post(self, endpoint, payload):
+        body = json.dumps(payload).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'}
+        if self.compress:
+            body = gzip.compress(body, compresslevel=1)
+            headers['Content-Encoding'] = 'gzip'
+        logging.debug("POST %s%s, %d bytes", self.base_url, endpoint, len(body))
+        response = self.session.post(self.base_url + endpoint, data=body, headers=headers,
+                                     timeout=self.timeout, stream=True)
+        if response.status_code >= 400:
+            response.close()
+            response.raise_for_status()
+        # the body read once as bytes, never held as text, then decoded in one go
+        content = response.raw.read(decode_content=True)
+        # the body is consumed: the connection goes back to the pool
+        response.raw.release_conn()
+        logging.debug("%s%s: status %d, %d bytes", self.base_url, endpoint, response.status_code, len(content))
+        return loads(content)
+
+    def query(self, query):
+        """The 'queries' of the response to a single query."""
+        return self.post(QUERY_ENDPOINT, query).get('queries')
+
+    def iter_query(self, query, window=None, max_workers=4):
+        """Yield (metric index, the 'queries' item of a window of the metric) in metric and time order.
+        The windows of all the metrics are asked concurrently by max_workers threads, at most
+        2 * max_workers responses are held waiting to be consumed."""
+        queries = [(m, q) for m, per_metric in enumerate(window_queries(query, window)) for q in per_metric]
+        logging.debug("KairosDB query split in %d requests", len(queries))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = []
+            for m, q in queries:
+                pending.append((m, executor.submit(self.query, q)))
+                if len(pending) >= 2 * max_workers:
+                    m0, future = pending.pop(0)
+                    yield m0, future.result()[0]
+            for m, future in pending:
+                yield m, future.result()[0]
+
+    def query_windows(self, query, window=None, max_workers=4):
+        """The 'queries' of query, asked by windows of window (milliseconds or a KairosDB relative
+        time) and merged: the same result of query(), one item per metric, held in memory."""
+        # the windows are merged as they arrive, the responses are not kept
+        return [merge_queries(q for _, q in group)
+                for _, group in groupby(self.iter_query(query, window, max_workers), key=lambda mq: mq[0])]
@@ -0,0 +1,54 @@
+import unittest
+
+from kairosdb_client import KairosDBClient, shared_client, split_windows, to_milliseconds
+from mock_kairosdb import MockKairosDB
+
+DAY = 86400 * 1000
+
+
+class MyTest(unittest.TestCase):
+    def setUp(self):
+        self.kairosdb = MockKairosDB(interval=60 * 1000).start()
+        self.client = KairosDBClient(self.kairosdb.url)
+        self.query = {'metrics': [{'name': 'device0.my.measure.temperature', 'tags': {}},
+                                  {'name': 'device1.my.measure.humidity', 'tags': {}}],
+                      'cache_time': 0,
+                      'start_absolute': 1530000000000,
+                      'end_absolute': 1530000000000 + 10 * DAY}
+
+    def tearDown(self):
+        self.kairosdb.stop()
+
+    def test_split_windows(self):
+        self.assertEqual(split_windows(0, 25, 10), [(0, 9), (10, 19), (20, 25)])
+        self.assertEqual(split_windows(0, 9, 10), [(0, 9)])
+        self.assertEqual(to_milliseconds({'value': '1', 'unit': 'days'}), DAY)
+
+    def test_windows(self):
+        expected = self.client.query(self.query)
+        merged = self.client.query_windows(self.query, {'value': '1', 'unit': 'days'}, max_workers=3)
+        self.assertEqual(merged, expected)
+        # one request for the whole range, then 11 windows for each of the 2 metrics
+        self.assertEqual(self.kairosdb.requests, 1 + 2 * 11)
+        self.assertEqual(merged[0]['sample_size'], 10 * 24 * 60 + 1)
+
+    def test_range_aggregators(self):
+        self.query['metrics'][0]['aggregators'] = [{'name': 'avg', 'sampling': {'value': '5', 'unit': 'hours'}}]
+        self.query['metrics'][1]['limit'] = 10
+        expected = self.client.query(self.query)
+        merged = self.client.query_windows(self.query, {'value': '1', 'unit': 'days'}, max_workers=3)
+        self.assertEqual(merged, expected)
+        # the two metrics are not split
+        self.assertEqual(self.kairosdb.requests, 1 + 2)
+
+    def test_keep_alive(self):
+        client = shared_client(self.kairosdb.url, lambda: KairosDBClient(self.kairosdb.url, compress=True))
+        self.assertIs(shared_client(self.kairosdb.url, lambda: None), client)
+        expected = self.client.query(self.query)
+        for _ in range(5):
+            self.assertEqual(client.query(self.query), expected)
+        # one connection of self.client, one of the shared client
+        self.assertEqual(self.kairosdb.connections, 2)
+
+if __name__ == '__main__':
+    unittest.main()
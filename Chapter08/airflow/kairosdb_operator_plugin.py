@@ -6,17 +6,40 @@ from airflow.operators import BashOperator
 from airflow.utils import apply_defaults
 import logging
 import textwrap
+import calendar
 import time
 import json
+import os
 import datetime
 import logging
 
+import requests
+
+from kairosdb_client import KairosDBClient, shared_client
+from kairosdb_writer import DatapointWriter
+import kairosdb_store
+from kairosdb_watermark import load_state, incremental_query
+
 
 class KairosDBOperator(BaseOperator):
     """
    Operator to facilitate interacting with the kairosDB which executes Apache Spark code via a REST API.
    :param query: Scala, the kairos query
    :type spark_script: string
+   :param window: if set, the time range of the query is asked by windows of this length,
+       milliseconds or a KairosDB relative time such as {"value": "1", "unit": "days"}; needs
+       output_path, so that the windows are written to files as they arrive instead of being
+       merged in memory and pushed to XCom
+   :param max_workers: concurrent requests of the windows and the metrics of the query
+   :param output_path: if set, the points are written in files under output_path/<dag>/<task>/<run>
+       and only a reference to them, with a summary of every metric, is returned (and pushed to XCom)
+   :param output_format: npy or parquet, see kairosdb_store.py
+   :param retention_days: the files of the runs of the task older than this are deleted by the
+       next run, None keeps them
+   :param watermark_key: if set, the Airflow Variable with the state of the incremental runs:
+       only the points after its watermark are asked, and the watermark is pushed into XCom
+       (key watermark) for the task that commits the new state (see kairosdb_watermark.py)
+   :param compress: gzip the queries (the responses are always asked gzip compressed)
 
    """
 
@@ -26,48 +49,146 @@ class KairosDBOperator(BaseOperator):
             self,
             query,
             http_conn_id='http_kairosdb',
+            window=None,
+            max_workers=4,
+            output_path=None,
+            output_format='npy',
+            retention_days=7,
+            watermark_key=None,
+            compress=False,
             *args, **kwargs):
         super(KairosDBOperator,self).__init__(*args,**kwargs)
+        if window is not None and output_path is None:
+            raise ValueError('window needs output_path: the windows of a long query do not fit in XCom')
         self.query=query
         self.http_conn_id = http_conn_id
-        self.acceptable_response_codes = [200, 201]
-        self.http = HttpHook("GET", http_conn_id=self.http_conn_id)
+        self.window = window
+        self.max_workers = max_workers
+        self.output_path = output_path
+        self.output_format = output_format
+        self.retention_days = retention_days
+        self.watermark_key = watermark_key
+        self.compress = compress
+        # the hook is built by execute: the DAG files are parsed far more often than the tasks run
+        self._http = None
+
+    @property
+    def http(self):
+        if self._http is None:
+            self._http = HttpHook("POST", http_conn_id=self.http_conn_id)
+        return self._http
 
     def execute(self, context):
-        # Simple test
-        headers={'Content-Type':'application/json'}
+        query = self.query
+        if self.watermark_key is not None:
+            # only the points not processed by the previous runs
+            watermark = load_state(self.watermark_key)['watermark']
+            logging.info("Watermark of %s: %s", self.watermark_key, watermark)
+            query = incremental_query(query, watermark)
+            context['ti'].xcom_push(key='watermark', value=watermark)
+
+        if self.output_path is not None:
+            # the points go to local files, XCom gets only the reference
+            runs = os.path.join(self.output_path, self.dag_id, self.task_id)
+            if self.retention_days is not None:
+                for removed in kairosdb_store.remove_old_runs(runs, self.retention_days):
+                    logging.info("Removed the files of %s", removed)
+            directory = os.path.join(runs, context['ts_nodash'])
+            return kairosdb_store.write_query(self._client(), query, directory, self.output_format,
+                                              self.window, self.max_workers)
 
-        response = self._http_rest_call("POST", "/api/v1/datapoints/query", data=json.dumps(self.query), headers=headers)
-        logging.debug("Status code: %d" % response.status_code)
-        if not(response.status_code in self.acceptable_response_codes):
+        # Simple test
+        logging.info("Querying KairosDB %s with %d metrics", self.http_conn_id, len(query.get('metrics', [])))
+        try:
+            if len(query.get('metrics', [])) > 1:
+                # the metrics are asked concurrently and merged
+                return self._client().query_windows(query, None, self.max_workers)
+            return self._client().query(query)
+        except requests.HTTPError as e:
+            # as the original operator: a failed query returns None
+            logging.error("KairosDB query failed: %s", e)
             return None
-        r=response.json()
-        logging.debug("JSON response: %s" % r)
-        
-        if r:
-            return r.get("queries")
-        else :
-            return None 
 
-    def _http_rest_call(self, method, endpoint, data=None, headers=None, extra_options=None):
-        if not extra_options:
-            extra_options = {}
-        logging.info("Performing HTTP REST call... (method: " + str(method) + ", endpoint: " + str(endpoint) + ", data: " + str(data) + ", headers: " + str(headers) + ")")
-        self.http.method = method
+    def _client(self):
+        # a client per connection, settings and process: the task runs in its own process, its
+        # requests share the keep-alive connections
+        pool_size = max(self.max_workers, 8)
+        def factory():
+            session = self.http.get_conn({'Content-Type': 'application/json'})
+            return KairosDBClient(self.http.base_url, session=session, pool_size=pool_size,
+                                  compress=self.compress)
+        return shared_client((self.http_conn_id, pool_size, self.compress), factory)
+
+class KairosDBWriteHook(HttpHook):
+    """
+   Hook to write datapoints in bulk to KairosDB or to OpenTSDB (see kairosdb_writer.py).
+   :param protocol: kairosdb (/api/v1/datapoints) or opentsdb (/api/put)
+
+   """
+
+    def __init__(self, http_conn_id='http_kairosdb', protocol='kairosdb'):
+        super(KairosDBWriteHook, self).__init__("POST", http_conn_id=http_conn_id)
+        self.protocol = protocol
+
+    def get_writer(self, **kwargs):
+        """A DatapointWriter on the connection, kwargs are batch_size, max_workers, retries, compress."""
+        session = self.get_conn({'Content-Type': 'application/json'})
+        return DatapointWriter(self.base_url, protocol=self.protocol, session=session, **kwargs)
 
-        response = self.http.run(endpoint, data, headers, extra_options=extra_options)
 
-        logging.debug("status_code: " + str(response.status_code))
-        logging.debug("response_as_json: " + str(response.json()))
+class KairosDBWriteOperator(BaseOperator):
+    """
+   Operator to write the KPIs computed by a task back to KairosDB or OpenTSDB.
+   :param metrics_task_id: the task returning the KPIs, a dict {metric name: value}
+   :param metric_suffix: appended to the names of the metrics, e.g. '.mean'
+   :param tags: tags of the points (OpenTSDB needs at least one)
+   :param protocol: kairosdb or opentsdb
+   :param batch_size, max_workers, compress: see kairosdb_writer.DatapointWriter
+   :param write_retries: the retries of a failed batch (DatapointWriter retries), the retries
+       of the task are the ones of BaseOperator
+
+   The points are written at the execution date of the run.
+
+   """
+
+    @apply_defaults
+    def __init__(
+            self,
+            metrics_task_id,
+            metric_suffix='',
+            tags=None,
+            http_conn_id='http_kairosdb',
+            protocol='kairosdb',
+            batch_size=5000,
+            max_workers=4,
+            write_retries=3,
+            compress=True,
+            *args, **kwargs):
+        super(KairosDBWriteOperator,self).__init__(*args,**kwargs)
+        self.metrics_task_id = metrics_task_id
+        self.metric_suffix = metric_suffix
+        self.tags = tags if tags is not None else {'source': 'airflow'}
+        self.http_conn_id = http_conn_id
+        self.protocol = protocol
+        self.writer_options = {'batch_size': batch_size, 'max_workers': max_workers,
+                               'retries': write_retries, 'compress': compress}
 
-        return response
+    def execute(self, context):
+        metrics = context['ti'].xcom_pull(key=None, task_ids=self.metrics_task_id) or {}
+        timestamp = calendar.timegm(context['execution_date'].utctimetuple()) * 1000
+        hook = KairosDBWriteHook(self.http_conn_id, self.protocol)
+        with hook.get_writer(**self.writer_options) as writer:
+            for name, value in metrics.items():
+                writer.add(name + self.metric_suffix, timestamp, value, self.tags)
+        logging.info("Written %s", writer.stats())
+        return writer.stats()['points']
 
 # Defining the plugin class
 class KairosDBOperatorPlugin(AirflowPlugin):
     name = "kairosdb_operator_plugin"
-    operators = [KairosDBOperator]
+    operators = [KairosDBOperator, KairosDBWriteOperator]
     flask_blueprints = []
-    hooks = []
+    hooks = [KairosDBWriteHook]
     executors = []
     admin_views = []
     menu_links = []
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""
+Local files of the KairosDB results, so that the time series do not go through XCom.
+
+    npy       a structured array (timestamp int64, value float64), <metric>.npy
+    parquet   a table with the columns timestamp and value, <metric>.parquet (needs pyarrow)
+"""
+import json
+import os
+import shutil
+import time
+
+try:
+    from urllib.parse import quote
+except ImportError:
+    # python 2
+    from urllib import quote
+
+import numpy as np
+
+FORMATS = ('npy', 'parquet')
+dtype = np.dtype([('timestamp', '<i8'), ('value', '<f8')])
+
+
+def _points(result):
+    points = np.array(result.get('values', []), dtype=np.float64).reshape(-1, 2)
+    records = np.empty(len(points), dtype=dtype)
+    records['timestamp'] = points[:, 0]
+    records['value'] = points[:, 1]
+    return records
+
+
+class SeriesWriter(object):
+    """Writes the points of a metric, a window at a time, and keeps their summary."""
+
+    def __init__(self, path, format='npy'):
+        if format not in FORMATS:
+            raise ValueError('unknown format %s, use one of %s' % (format, ', '.join(FORMATS)))
+        self.path = path
+        self.format = format
+        self.summary = {'count': 0, 'sum': 0.0, 'sumsq': 0.0, 'min': None, 'max': None,
+                        'first_timestamp': None, 'last_timestamp': None}
+        if format == 'npy':
+            # the records are appended to a raw file, the header of the .npy is written at the end
+            self.raw = open(path + '.raw', 'wb')
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            self.schema = pa.schema([('timestamp', pa.int64()), ('value', pa.float64())])
+            self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, records):
+        if len(records) == 0:
+            return
+        values = records['value']
+        s = self.summary
+        s['count'] += int(len(records))
+        s['sum'] += float(values.sum())
+        s['sumsq'] += float(np.dot(values, values))
+        s['min'] = float(values.min()) if s['min'] is None else min(s['min'], float(values.min()))
+        s['max'] = float(values.max()) if s['max'] is None else max(s['max'], float(values.max()))
+        # the groups of a group_by are not in time order with each other
+        first, last = int(records['timestamp'].min()), int(records['timestamp'].max())
+        s['first_timestamp'] = first if s['first_timestamp'] is None else min(s['first_timestamp'], first)
+        s['last_timestamp'] = last if s['last_timestamp'] is None else max(s['last_timestamp'], last)
+        if self.format == 'npy':
+            records.tofile(self.raw)
+        else:
+            import pyarrow as pa
+            self.writer.write_table(pa.Table.from_arrays([pa.array(records['timestamp']), pa.array(values)],
+                                                         schema=self.schema))
+
+    def close(self):
+        if self.format == 'npy':
+            self.raw.close()
+            with open(self.path, 'wb') as f:
+                np.lib.format.write_array_header_1_0(f, {'descr': np.lib.format.dtype_to_descr(dtype),
+                                                         'fortran_order': False,
+                                                         'shape': (self.summary['count'],)})
+                with open(self.path + '.raw', 'rb') as raw:
+                    shutil.copyfileobj(raw, f, 1 << 20)
+            os.remove(self.path + '.raw')
+        else:
+            self.writer.close()
+        return self.summary
+
+
+def file_name(name, format):
+    """The file of the metric name in the directory: percent-encoded, with no /."""
+    return '%s.%s' % (quote(name, safe=''), format)
+
+
+def write_query(client, query, directory, format='npy', window=None, max_workers=4):
+    """Run query with the KairosDBClient client (by windows, see KairosDBClient.iter_query) and
+    write the points of every metric in directory. Returns the reference to pass to load()."""
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    writers = {}
+    for _, q in client.iter_query(query, window, max_workers):
+        for result in q.get('results', []):
+            name = result['name']
+            if name not in writers:
+                writers[name] = SeriesWriter(os.path.join(directory, file_name(name, format)), format)
+            writers[name].write(_points(result))
+    metrics = {}
+    for name, writer in writers.items():
+        metrics[name] = dict(writer.close(), file=os.path.basename(writer.path))
+    reference = {'path': directory, 'format': format, 'metrics': metrics}
+    with open(os.path.join(directory, 'reference.json'), 'w') as f:
+        json.dump(reference, f)
+    return reference
+
+
+def remove_old_runs(directory, retention_days, now=None):
+    """Delete the subdirectories of directory (the runs of a task) not modified for retention_days.
+    Returns the directories removed."""
+    if not os.path.isdir(directory):
+        return []
+    limit = (time.time() if now is None else now) - retention_days * 86400
+    removed = []
+    for entry in sorted(os.listdir(directory)):
+        path = os.path.join(directory, entry)
+        if os.path.isdir(path) and os.path.getmtime(path) < limit:
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path)
+    return removed
+
+
+def is_reference(data):
+    return isinstance(data, dict) and 'path' in data and 'metrics' in data
+
+
+def load(reference, name):
+    """(timestamps, values) of the metric name, memory mapped from the file of the reference."""
+    path = os.path.join(reference['path'], reference['metrics'][name]['file'])
+    if reference['format'] == 'npy':
+        records = np.load(path, mmap_mode='r')
+        return records['timestamp'], records['value']
+    import pyarrow.parquet as pq
+    table = pq.read_table(path, memory_map=True)
+    return table.column('timestamp').to_numpy(), table.column('value').to_numpy()
+
+
+def load_arrays(reference):
+    """{metric name: (timestamps, values)} of all the metrics of the reference."""
+    return dict((name, load(reference, name)) for name in reference['metrics'])
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from kairosdb_analytics import means, to_arrays
+from kairosdb_client import KairosDBClient
+from kairosdb_store import write_query, load, remove_old_runs
+from mock_kairosdb import MockKairosDB
+
+DAY = 86400 * 1000
+
+try:
+    import pyarrow
+    formats = ['npy', 'parquet']
+except ImportError:
+    formats = ['npy']
+
+
+class MyTest(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.query = {'metrics': [{'name': 'device0.my.measure.temperature', 'tags': {}},
+                                  {'name': 'device1.my.measure.humidity', 'tags': {}}],
+                      'start_absolute': 1530000000000,
+                      'end_absolute': 1530000000000 + 3 * DAY}
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_write(self):
+        with MockKairosDB(interval=60 * 1000) as kairosdb:
+            client = KairosDBClient(kairosdb.url)
+            expected = to_arrays(client.query(self.query))
+            for format in formats:
+                reference = write_query(client, self.query, os.path.join(self.path, format), format,
+                                        window={'value': '12', 'unit': 'hours'}, max_workers=2)
+                self.assertEqual(means(reference), means(client.query(self.query)))
+                for name, (timestamps, values) in expected.items():
+                    t, v = load(reference, name)
+                    np.testing.assert_array_equal(t, timestamps)
+                    np.testing.assert_array_equal(v, values)
+                    summary = reference['metrics'][name]
+                    self.assertEqual(summary['count'], len(values))
+                    self.assertAlmostEqual(summary['sum'], values.sum())
+                    self.assertEqual(summary['last_timestamp'], timestamps[-1])
+
+    def test_group_by(self):
+        class Client(object):
+            def iter_query(self, query, window, max_workers):
+                # two groups of a metric whose name is not a file name
+                yield 0, {'results': [{'name': '../a/b', 'values': [[5, 1.0], [6, 2.0]]},
+                                      {'name': '../a/b', 'values': [[1, 3.0], [2, 4.0]]}]}
+        reference = write_query(Client(), {}, os.path.join(self.path, 'run'))
+        self.assertEqual(os.listdir(self.path), ['run'])
+        summary = reference['metrics']['../a/b']
+        self.assertEqual((summary['first_timestamp'], summary['last_timestamp']), (1, 6))
+        np.testing.assert_array_equal(load(reference, '../a/b')[1], [1, 2, 3, 4])
+
+    def test_retention(self):
+        for run, age in (('old', 8), ('new', 1)):
+            os.makedirs(os.path.join(self.path, run))
+            mtime = 1530000000 - age * 86400
+            os.utime(os.path.join(self.path, run), (mtime, mtime))
+        self.assertEqual(remove_old_runs(self.path, 7, now=1530000000), [os.path.join(self.path, 'old')])
+        self.assertEqual(os.listdir(self.path), ['new'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Incremental runs of the scheduled DAGs on KairosDB, the state kept in an Airflow Variable:
+
+    {"watermark": 1530000000000,                       last timestamp processed (epoch milliseconds)
+     "metrics": {"device0.my.measure.temperature":     running aggregates of all the points processed
+                    {"count": 525600, "sum": ..., "sumsq": ...}}}
+"""
+import copy
+import json
+import math
+
+import kairosdb_store
+from kairosdb_analytics import to_arrays
+
+
+def empty_state():
+    return {'watermark': None, 'metrics': {}}
+
+
+def load_state(key):
+    from airflow.models import Variable
+    return Variable.get(key, default_var=empty_state(), deserialize_json=True)
+
+
+def save_state(key, state):
+    from airflow.models import Variable
+    Variable.set(key, state, serialize_json=True)
+
+
+def check_watermark(state, watermark):
+    """Raise ValueError if the state moved past the watermark the points were queried from."""
+    if state['watermark'] != watermark:
+        raise ValueError('the watermark moved from %s to %s since the query: the points of this run '
+                         'were already added by another run' % (watermark, state['watermark']))
+
+
+def commit_state(key, watermark, summaries):
+    """Add summaries (the points queried after watermark) to the state of key and move the watermark,
+    a compare-and-swap on the Variable row locked until the commit. Returns the new state."""
+    from airflow.models import Variable
+    from airflow.utils.db import create_session
+    with create_session() as session:
+        variable = session.query(Variable).filter(Variable.key == key).with_for_update().first()
+        state = json.loads(variable.val) if variable is not None else empty_state()
+        check_watermark(state, watermark)
+        state = update_state(state, summaries)
+        if variable is None:
+            session.add(Variable(key=key, val=json.dumps(state)))
+        else:
+            variable.val = json.dumps(state)
+    return state
+
+
+def incremental_query(query, watermark):
+    """query restricted to the points after watermark (the query itself if watermark is None)."""
+    if watermark is None:
+        return query
+    query = copy.deepcopy(query)
+    query.pop('start_relative', None)
+    query['start_absolute'] = int(watermark) + 1
+    return query
+
+
+def summaries_of(data):
+    """{metric name: count, sum, sumsq, last_timestamp} of the result of the KairosDB operator:
+    the summary of the reference to the local files, or computed on the 'queries' of the response."""
+    if kairosdb_store.is_reference(data):
+        return data['metrics']
+    summaries = {}
+    for name, (timestamps, values) in to_arrays(data or []).items():
+        summaries[name] = {'count': int(len(values)),
+                           'sum': float(values.sum()),
+                           'sumsq': float(values.dot(values)),
+                           'last_timestamp': int(timestamps.max()) if len(timestamps) else None}
+    return summaries
+
+
+def update_state(state, summaries):
+    """The new state after the points of summaries: aggregates added, watermark moved to the last point."""
+    state = copy.deepcopy(state)
+    for name, s in summaries.items():
+        if not s.get('count'):
+            continue
+        m = state['metrics'].setdefault(name, {'count': 0, 'sum': 0.0, 'sumsq': 0.0})
+        m['count'] += s['count']
+        m['sum'] += s['sum']
+        m['sumsq'] += s['sumsq']
+        if state['watermark'] is None or s['last_timestamp'] > state['watermark']:
+            state['watermark'] = s['last_timestamp']
+    return state
+
+
+def running_stats(state):
+    """{metric name: count, mean, std} of all the points processed."""
+    stats = {}
+    for name, m in state['metrics'].items():
+        mean = m['sum'] / m['count']
+        stats[name] = {'count': m['count'],
+                       'mean': mean,
+                       'std': math.sqrt(max(m['sumsq'] / m['count'] - mean * mean, 0.0))}
+    return stats
@@ -0,0 +1,40 @@
+import unittest
+
+import numpy as np
+
+from kairosdb_analytics import to_arrays
+from kairosdb_client import KairosDBClient
+from kairosdb_watermark import empty_state, check_watermark, incremental_query, summaries_of, update_state, running_stats
+from mock_kairosdb import MockKairosDB
+
+DAY = 86400 * 1000
+START = 1530000000000
+
+
+class MyTest(unittest.TestCase):
+    def test_runs(self):
+        query = {'metrics': [{'name': 'device0.my.measure.temperature', 'tags': {}}],
+                 'start_absolute': START, 'end_absolute': START + DAY}
+        self.assertIs(incremental_query(query, None), query)
+        with MockKairosDB(interval=60 * 1000) as kairosdb:
+            client = KairosDBClient(kairosdb.url)
+            state = empty_state()
+            # three scheduled runs, every one sees one more day
+            for day in range(1, 4):
+                watermark = state['watermark']
+                q = incremental_query(dict(query, end_absolute=START + day * DAY), watermark)
+                data = client.query(q)
+                self.assertLessEqual(len(data[0]['results'][0]['values']), 24 * 60 + 1)
+                check_watermark(state, watermark)
+                state = update_state(state, summaries_of(data))
+            # a run that queried from an old watermark is not added again
+            self.assertRaises(ValueError, check_watermark, state, watermark)
+            self.assertEqual(state['watermark'], START + 3 * DAY)
+            _, values = to_arrays(client.query(dict(query, end_absolute=START + 3 * DAY)))['device0.my.measure.temperature']
+        stats = running_stats(state)['device0.my.measure.temperature']
+        self.assertEqual(stats['count'], len(values))
+        self.assertAlmostEqual(stats['mean'], values.mean())
+        self.assertAlmostEqual(stats['std'], values.std(), places=6)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+"""
+Bulk writes of datapoints to KairosDB (/api/v1/datapoints) or OpenTSDB (/api/put).
+
+    with DatapointWriter('http://localhost:8080') as writer:
+        writer.add('device0.my.measure.temperature.mean', 1530000000000, 21.5, {'source': 'airflow'})
+    print(writer.stats())
+"""
+import gzip
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+ENDPOINTS = {'kairosdb': '/api/v1/datapoints', 'opentsdb': '/api/put'}
+
+
+def kairosdb_payload(points):
+    """The body of /api/v1/datapoints: the points grouped by metric and tags."""
+    series = {}
+    for name, timestamp, value, tags in points:
+        key = (name, tuple(sorted(tags.items())))
+        if key not in series:
+            series[key] = {'name': name, 'datapoints': [], 'tags': tags}
+        series[key]['datapoints'].append([timestamp, value])
+    return list(series.values())
+
+
+def opentsdb_payload(points):
+    """The body of /api/put: one object per point (timestamps in milliseconds)."""
+    return [{'metric': name, 'timestamp': timestamp, 'value': value, 'tags': tags}
+            for name, timestamp, value, tags in points]
+
+
+PAYLOADS = {'kairosdb': kairosdb_payload, 'opentsdb': opentsdb_payload}
+# the headers of a gzipped body: KairosDB does not decode Content-Encoding, it takes a gzip file
+GZIP_HEADERS = {'kairosdb': {'Content-Type': 'application/gzip'},
+                'opentsdb': {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}}
+
+
+class DatapointWriter(object):
+    """
+    :param base_url: URL of KairosDB (e.g. http://localhost:8080) or OpenTSDB (e.g. http://localhost:4242)
+    :param protocol: kairosdb or opentsdb
+    :param batch_size: points of a request
+    :param max_workers: concurrent requests
+    :param retries: attempts after the first one of a failed batch
+    :param compress: gzip the requests
+    :param session: the requests session to use (e.g. the one of an Airflow HttpHook), a new one if None
+    """
+
+    def __init__(self, base_url, protocol='kairosdb', batch_size=5000, max_workers=4, retries=3,
+                 backoff=0.5, compress=True, timeout=60, session=None):
+        if protocol not in ENDPOINTS:
+            raise ValueError('unknown protocol %s, use one of %s' % (protocol, ', '.join(ENDPOINTS)))
+        self.url = base_url.rstrip('/') + ENDPOINTS[protocol]
+        self.payload = PAYLOADS[protocol]
+        self.gzip_headers = GZIP_HEADERS[protocol]
+        self.batch_size = batch_size
+        self.retries = retries
+        self.backoff = backoff
+        self.compress = compress
+        self.timeout = timeout
+        self.session = session if session is not None else requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.pending = threading.BoundedSemaphore(2 * max_workers)
+        self.buffer = []
+        self.futures = []
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.points = 0
+        self.requests = 0
+        self.failed_attempts = 0
+
+    def add(self, name, timestamp, value, tags=None):
+        """Buffer a point (timestamp in epoch milliseconds), a batch is sent when batch_size points are buffered."""
+        self.buffer.append((name, int(timestamp), value, tags or {}))
+        if len(self.buffer) >= self.batch_size:
+            self._send_buffer()
+
+    def add_series(self, name, timestamps, values, tags=None):
+        """Buffer the points of a series, e.g. two numpy arrays."""
+        tags = tags or {}
+        timestamps = timestamps.tolist() if hasattr(timestamps, 'tolist') else timestamps
+        values = values.tolist() if hasattr(values, 'tolist') else values
+        for timestamp, value in zip(timestamps, values):
+            self.buffer.append((name, int(timestamp), value, tags))
+            if len(self.buffer) >= self.batch_size:
+                self._send_buffer()
+
+    def _send_buffer(self):
+        batch, self.buffer = self.buffer, []
+        self.pending.acquire()
+        future = self.executor.submit(self._post, batch)
+        future.add_done_callback(lambda f: self.pending.release())
+        self.futures.append(future)
+        # drop the futures already done, the errors are raised by flush()
+        if len(self.futures) > 100:
+            self.futures = [f for f in self.futures if not f.done() or f.exception() is not None]
+
+    def _post(self, batch):
+        body = json.dumps(self.payload(batch)).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        if self.compress:
+            body = gzip.compress(body, compresslevel=1)
+            headers = self.gzip_headers
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.post(self.url, data=body, headers=headers, timeout=self.timeout)
+                if response.status_code < 500:
+                    response.raise_for_status()
+                    with self.lock:
+                        self.points += len(batch)
+                        self.requests += 1
+                    return
+                error = requests.HTTPError('%s status %d' % (self.url, response.status_code), response=response)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            with self.lock:
+                self.failed_attempts += 1
+            if attempt < self.retries:
+                logging.warning("Write of %d points failed (%s), retrying", len(batch), error)
+                time.sleep(self.backoff * 2 ** attempt)
+        raise error
+
+    def flush(self):
+        """Send the buffered points and wait for all the batches, raise the first error."""
+        if self.buffer:
+            self._send_buffer()
+        futures, self.futures = self.futures, []
+        for future in futures:
+            future.result()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def stats(self):
+        elapsed = max(time.time() - self.started, 1e-9)
+        return {'points': self.points,
+                'requests': self.requests,
+                'failed_attempts': self.failed_attempts,
+                'seconds': elapsed,
+                'points_per_sec': self.points / elapsed}
@@ -0,0 +1,70 @@
+import gzip
+import json
+import unittest
+
+import numpy as np
+import requests
+
+from kairosdb_writer import DatapointWriter
+from mock_kairosdb import MockKairosDB
+
+
+class MyTest(unittest.TestCase):
+    def test_protocols(self):
+        timestamps = 1530000000000 + 1000 * np.arange(2500)
+        values = np.random.RandomState(0).rand(2500)
+        for protocol, compress in [(p, c) for p in ['kairosdb', 'opentsdb'] for c in [True, False]]:
+            with MockKairosDB(keep=True) as kairosdb:
+                with DatapointWriter(kairosdb.url, protocol, batch_size=1000, max_workers=2,
+                                     compress=compress) as writer:
+                    writer.add_series('device0.my.measure.temperature', timestamps, values, {'host': 'h0'})
+                    writer.add('device0.my.measure.temperature.mean', timestamps[0], 0.5, {'host': 'h0'})
+                self.assertEqual(writer.stats()['requests'], 3)
+                self.assertEqual(writer.stats()['points'], 2501)
+                points = sorted(kairosdb.server.store['device0.my.measure.temperature'])
+                np.testing.assert_array_equal(np.array(points)[:, 1], values)
+                self.assertEqual(kairosdb.server.written['device0.my.measure.temperature.mean'], 1)
+
+    def test_content_type(self):
+        body = gzip.compress(json.dumps([{'name': 'm', 'datapoints': [[0, 1.0]], 'tags': {}}]).encode('utf-8'))
+        with MockKairosDB() as kairosdb:
+            url = kairosdb.url + '/api/v1/datapoints'
+            # KairosDB does not decode Content-Encoding: a gzip body is sent as application/gzip
+            response = requests.post(url, data=body, headers={'Content-Type': 'application/json',
+                                                              'Content-Encoding': 'gzip'})
+            self.assertEqual(response.status_code, 400)
+            response = requests.post(url, data=body, headers={'Content-Type': 'text/plain'})
+            self.assertEqual(response.status_code, 400)
+            response = requests.post(url, data=body, headers={'Content-Type': 'application/gzip'})
+            self.assertEqual(response.status_code, 204)
+            self.assertEqual(kairosdb.server.written['m'], 1)
+
+    def test_retries(self):
+        with MockKairosDB(fail=2) as kairosdb:
+            with DatapointWriter(kairosdb.url, batch_size=10, backoff=0.01) as writer:
+                writer.add('m', 0, 1.0)
+            self.assertEqual(writer.stats()['failed_attempts'], 2)
+            self.assertEqual(kairosdb.server.written['m'], 1)
+        with MockKairosDB(fail=5) as kairosdb:
+            writer = DatapointWriter(kairosdb.url, retries=1, backoff=0.01)
+            writer.add('m', 0, 1.0)
+            self.assertRaises(Exception, writer.close)
+
+    def test_timeout(self):
+        class Session(requests.Session):
+            timeouts = 1
+
+            def post(self, *args, **kwargs):
+                if self.timeouts:
+                    self.timeouts -= 1
+                    raise requests.exceptions.ReadTimeout('read timed out')
+                return requests.Session.post(self, *args, **kwargs)
+
+        with MockKairosDB() as kairosdb:
+            with DatapointWriter(kairosdb.url, backoff=0.01, session=Session()) as writer:
+                writer.add('m', 0, 1.0)
+            self.assertEqual(writer.stats()['failed_attempts'], 1)
+            self.assertEqual(kairosdb.server.written['m'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
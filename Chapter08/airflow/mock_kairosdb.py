@@ -0,0 +1,178 @@
+"""
+Local mock of the KairosDB REST API, for the tests and the benchmarks of the Airflow plugin:
+bulk writes (with fail=n the first n writes are answered with 503) and queries on generated data.
+
+Usage: python mock_kairosdb.py --port 8080 --interval 1000
+"""
+import argparse
+import gzip
+import json
+import math
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+except ImportError:
+    # python < 3.7
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+    class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+from kairosdb_client import QUERY_ENDPOINT, time_range, to_milliseconds
+
+WRITE_ENDPOINTS = ('/api/v1/datapoints', '/api/put')
+
+DAY = 86400 * 1000
+
+
+def value(name, ts):
+    return round(20.0 + len(name) % 5 + 5 * math.sin(2 * math.pi * (ts % DAY) / DAY), 3)
+
+
+def datapoints(name, start, end, interval):
+    first = -(-start // interval) * interval
+    return [[ts, value(name, ts)] for ts in range(first, end + 1, interval)]
+
+
+SAMPLERS = {'avg': lambda v: sum(v) / len(v), 'min': min, 'max': max, 'sum': sum, 'count': len}
+
+
+def aggregate(values, aggregator, start):
+    if aggregator['name'] == 'scale':
+        factor = float(aggregator['factor'])
+        return [[ts, v * factor] for ts, v in values]
+    sampling = to_milliseconds(aggregator['sampling'])
+    samples = {}
+    for ts, v in values:
+        samples.setdefault(start + (ts - start) // sampling * sampling, []).append(v)
+    return [[ts, SAMPLERS[aggregator['name']](v)] for ts, v in sorted(samples.items())]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        # the handlers run in their own threads
+        with self.server.lock:
+            self.server.connections += 1
+
+    def reply(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=1)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def write(self, series):
+        with self.server.lock:
+            self.server.writes += 1
+            if self.server.writes <= self.server.fail:
+                return self.reply(503, b'{"errors": ["unavailable"]}')
+            for s in series:
+                if 'datapoints' in s:
+                    name, points = s['name'], s['datapoints']
+                else:
+                    name, points = s['metric'], [[s['timestamp'], s['value']]]
+                self.server.written[name] = self.server.written.get(name, 0) + len(points)
+                if self.server.keep:
+                    self.server.store.setdefault(name, []).extend(points)
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path == WRITE_ENDPOINTS[0]:
+            # as KairosDB: JSON or a gzip file of JSON, Content-Encoding is not decoded
+            content_type = self.headers.get('Content-Type', '').split(';')[0].strip()
+            if content_type == 'application/gzip':
+                body = gzip.decompress(body)
+            elif content_type != 'application/json':
+                return self.reply(400, b'{"errors": ["Content-Type must be application/json or application/gzip"]}')
+        elif self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        if self.path in WRITE_ENDPOINTS:
+            try:
+                series = json.loads(body.decode('utf-8'))
+            except ValueError:
+                return self.reply(400, b'{"errors": ["invalid json"]}')
+            return self.write(series)
+        if self.path != QUERY_ENDPOINT:
+            return self.reply(404, b'{"errors": ["not found"]}')
+        with self.server.lock:
+            self.server.requests += 1
+        query = json.loads(body.decode('utf-8'))
+        start, end = time_range(query)
+        queries = []
+        for metric in query['metrics']:
+            values = datapoints(metric['name'], start, end, self.server.interval)
+            sample_size = len(values)
+            for aggregator in metric.get('aggregators', []):
+                values = aggregate(values, aggregator, start)
+            queries.append({'sample_size': sample_size,
+                            'results': [{'name': metric['name'],
+                                         'group_by': [{'name': 'type', 'type': 'number'}],
+                                         'tags': {'host': ['server1']},
+                                         'values': values}]})
+        self.reply(200, json.dumps({'queries': queries}).encode('utf-8'))
+
+
+class MockKairosDB(object):
+    """The mock server running in a thread: with MockKairosDB() as kairosdb: ... kairosdb.url"""
+
+    def __init__(self, port=0, interval=1000, keep=False, fail=0):
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.server.interval = interval
+        self.server.lock = threading.Lock()
+        self.server.keep = keep
+        self.server.fail = fail
+        self.server.writes = 0
+        self.server.written = {}        # metric name -> points written
+        self.server.store = {}          # metric name -> points, if keep
+        self.server.requests = 0
+        self.server.connections = 0
+        self.url = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        self.thread = None
+
+    @property
+    def requests(self):
+        return self.server.requests
+
+    @property
+    def connections(self):
+        return self.server.connections
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--interval', type=int, default=1000, help='milliseconds between two points')
+    args = parser.parse_args()
+    mock = MockKairosDB(args.port, args.interval)
+    print('Mock KairosDB on %s' % mock.url)
+    mock.server.serve_forever()
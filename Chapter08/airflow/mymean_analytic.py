@@ -10,25 +10,28 @@ from datetime import datetime
 from airflow import DAG
 from airflow.operators.dummy_operator import DummyOperator
 from airflow.operators.python_operator import PythonOperator
-from airflow.operators import KairosDBOperator
+from airflow.operators import KairosDBOperator, KairosDBWriteOperator
+from kairosdb_watermark import commit_state, summaries_of, running_stats
 import datetime
 import logging
 
+# the points read from KairosDB are written here, XCom carries only a reference to the files
+# (on a distributed deployment this must be a storage shared by the workers)
+data_path = '/tmp/iiot-book/kairosdb'
+# the Variable with the watermark and the running aggregates of the incremental runs
+state_key = 'mymean_state'
+
 
 def my_mean(ds, **kwargs):
     logging.info("kwargs: %s" % kwargs)
     logging.info("ds: %s" % ds)
     ti = kwargs['ti']
-    data = ti.xcom_pull(key=None, task_ids=['get_data'])
-    return _mean(data)
-
-def _mean(data):
-    ret={}
-    for d in data:
-        results = d['results']
-        for r in results:
-            m = [float(sum(l))/len(l) for l in zip(*r['values'])]
-            ret[r['name']] = m[1]
+    data = ti.xcom_pull(key=None, task_ids='get_data')
+    # the watermark the points were queried from, not the one of the state now
+    watermark = ti.xcom_pull(key='watermark', task_ids='get_data')
+    # add the new points to the running aggregates and move the watermark, in a single locked write
+    state = commit_state(state_key, watermark, summaries_of(data))
+    ret = dict((name, s['mean']) for name, s in running_stats(state).items())
     print(ret)
     return ret
 
@@ -36,13 +39,25 @@ def print_context(ds, **kwargs):
     logging.info("kwargs: %s" % kwargs)
     logging.info("ds: %s" % ds)
     ti = kwargs['ti']
+    # the reference to the files and the summary of the metrics, not the points
     return 'Whatever you return gets printed in the logs ' + str(ti.xcom_pull(key=None, task_ids=['get_data']))
 
-dag = DAG('mymean', description='Simple Mean of the temperature from last year',
+# one run at a time: two overlapping runs would query the points after the same watermark
+dag = DAG('mymean', description='Running mean of the temperature, since a year before the first run',
           default_args = {'owner': 'iiot-book'},
           schedule_interval='* * * * 0',
+          max_active_runs=1,
           start_date=datetime.datetime(2018, 6, 21), catchup=False)
 
+dag.doc_md = """
+Mean of `device0.my.measure.temperature`, written back as `device0.my.measure.temperature.mean`.
+
+**The mean is cumulative**: it is the mean of all the points since a year before the first run,
+not a mean over the last year. Every run adds only the points after the watermark kept in the
+Variable `mymean_state` (see kairosdb_watermark.py), the points older than a year are never removed.
+Delete the Variable to start again from a year back.
+"""
+
 kairos_operator = KairosDBOperator(
             task_id='get_data',
             query={
@@ -65,6 +80,8 @@ kairos_operator = KairosDBOperator(
                         "unit": "years"
                     }
                     },
+            output_path=data_path,
+            watermark_key=state_key,
             dag=dag)
 
 print_task = PythonOperator(
@@ -76,8 +93,15 @@ print_task = PythonOperator(
 myanalytic_task= PythonOperator(
     task_id='myanalytic',
     provide_context=True,
-    python_callable=print_context,
+    python_callable=my_mean,
+    dag=dag)
+
+# the running means back to KairosDB, as device0.my.measure.temperature.mean
+write_task = KairosDBWriteOperator(
+    task_id='write_mean',
+    metrics_task_id='myanalytic',
+    metric_suffix='.mean',
     dag=dag)
 
-kairos_operator >> print_task >> myanalytic_task
+kairos_operator >> print_task >> myanalytic_task >> write_task
 
@@ -0,0 +1,175 @@
+"""
+Anomaly detection functions of the book.
+
+Only numpy is imported here: statsmodels, scikit-learn and matplotlib are imported
+by the functions that need them, so importing the detectors is fast.
+The analysis on the airplane dataset is in my_anomaly_detection.py.
+"""
+import numpy as np
+
+
+def moving_average(data, window_size):
+    """Centered moving average, same output of np.convolve(data, window, 'same')
+    computed in O(n) with a cumulative sum."""
+    data = np.asarray(data, dtype=float)
+    window_size = int(window_size)
+    n = len(data)
+    if window_size > n:
+        window = np.ones(window_size)/float(window_size)
+        return np.convolve(data, window, 'same')
+
+    c = np.concatenate(([0.0], np.cumsum(data)))
+    shift = (window_size - 1)//2
+    i = np.arange(n)
+    hi = np.minimum(i + shift + 1, n)
+    lo = np.maximum(i + shift + 1 - window_size, 0)
+    return (c[hi] - c[lo]) / float(window_size)
+
+
+def search_anomalies(y, window_size, sigma=1.0):
+
+    y = np.asarray(y)
+    avg = moving_average(y, window_size)
+    residual = y - avg
+    # Calculate the variation in the distribution of the residual
+    std = np.std(residual)
+
+    # boolean mask of the points outside avg +/- sigma*std
+    mask = np.abs(residual) > sigma*std
+    indices = np.flatnonzero(mask)
+    anomalies = [[i, y_i] for i, y_i in zip(indices.tolist(), y[indices])]
+
+    return {'std': round(std, 3),
+            'indices': indices,
+            'anomalies': anomalies}
+
+
+class StreamingAnomalyDetector(object):
+    """Incremental version of search_anomalies for live feeds.
+
+    The rule is the same of search_anomalies: a point is an anomaly if abs(residual) > sigma*std,
+    the residual being the difference from the centered moving average of window_size points.
+    The centered window needs the next (window_size - 1)//2 points, so a point is decided with
+    that delay and update/update_many return the indices (from the start of the feed) of the
+    anomalies decided so far; flush() decides the last points at the end of the feed, like the
+    truncated window of moving_average.
+
+    The only difference with search_anomalies is std: the standard deviation of the residuals
+    of the previous points (running mean and variance), not of the whole series, that is not
+    known yet. Every point costs O(1) with update; update_many processes a micro-batch with numpy.
+    """
+
+    def __init__(self, window_size, sigma=1.0):
+        self.window_size = int(window_size)
+        self.shift = (self.window_size - 1)//2
+        self.sigma = sigma
+        # the last window_size points, the point i is in buffer[i % window_size]
+        self.buffer = np.zeros(self.window_size)
+        self.window_sum = 0.0
+        self.count = 0
+        # running statistics of the residual
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2/self.n) if self.n > 0 else 0.0
+
+    def update(self, y_i):
+        """Add a point, return the list (empty or of one index) of the anomalies decided."""
+        pos = self.count % self.window_size
+        self.window_sum += y_i - self.buffer[pos]
+        self.buffer[pos] = y_i
+        self.count += 1
+        j = self.count - 1 - self.shift
+        if j < 0:
+            return []
+
+        # the window of the point j is complete
+        residual = self.buffer[j % self.window_size] - self.window_sum/self.window_size
+        # compare with the variation seen so far, then update it
+        anomaly = self.n > 1 and abs(residual) > self.sigma*self.std
+        self.n += 1
+        delta = residual - self.mean
+        self.mean += delta/self.n
+        self.m2 += delta*(residual - self.mean)
+        return [j] if anomaly else []
+
+    def update_many(self, y):
+        """Add a micro-batch of points, return the indices of the anomalies decided."""
+        y = np.asarray(y, dtype=float)
+        m = len(y)
+        if m == 0:
+            return []
+        w = self.window_size
+        # the last w points in time order, then the batch
+        ext = np.concatenate((np.roll(self.buffer, -(self.count % w)), y))
+        c = np.concatenate(([0.0], np.cumsum(ext)))
+        # arrival k decides the point count + k - shift, its window ends at ext[w + k]
+        k = np.arange(max(self.shift - self.count, 0), m)
+        avg = (c[w + k + 1] - c[k + 1]) / w
+        residuals = ext[w + k - self.shift] - avg
+        indices = self.count + k - self.shift
+
+        # running mean and M2 before every residual: the current state merged with the
+        # prefix of the batch (sums of the deviations from the current mean)
+        d = residuals - self.mean
+        s1 = np.concatenate(([0.0], np.cumsum(d)))
+        s2 = np.concatenate(([0.0], np.cumsum(d*d)))
+        n = self.n + np.arange(len(d) + 1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            m2 = self.m2 + s2 - s1*s1/n
+            std = np.sqrt(np.maximum(m2, 0)/n)
+        anomalies = (n[:-1] > 1) & (np.abs(residuals) > self.sigma*std[:-1])
+
+        if len(d):
+            self.mean += s1[-1]/n[-1]
+            self.m2 = m2[-1]
+            self.n = int(n[-1])
+        self.count += m
+        last = ext[-w:]
+        self.buffer = np.roll(last, self.count % w)
+        self.window_sum = last.sum()
+        return indices[anomalies].tolist()
+
+    def flush(self):
+        """End of the feed: decide the last points, with the window truncated at the end."""
+        count = self.count
+        # the missing points of the window count as zero, as in moving_average
+        anomalies = self.update_many(np.zeros(self.shift))
+        self.count = count
+        return anomalies
+
+def ARIMA_residuals(series):
+    import pandas as pd
+    from statsmodels.tsa.arima_model import ARIMA
+
+    print(series)
+    # fit model
+    model = ARIMA(series, order=(5,1,3))
+    model_fit = model.fit(disp=0)
+    print(model_fit.summary())
+    # plot residual errors
+    residuals = pd.DataFrame(model_fit.resid)
+    return residuals.T
+
+def search_anomalies_OCSVM(y):
+    import matplotlib.pyplot as plt
+    from sklearn import svm
+
+    print(len(y))
+    plt.scatter([yy[0] for yy in y] ,[yy[1] for yy in y], s=1)
+    X_train=y
+    clf = svm.OneClassSVM(nu=0.005, kernel="rbf", gamma=0.01)
+    clf.fit(X_train)
+    anomalies=[]
+    X_test=y
+    y_pred_test = clf.predict(X_test)
+    for i in range(0,len(y)):
+        if(y_pred_test[i]<0):
+            anomalies.append([[i, X_test[i][0]],[i, X_test[i][1]]])
+            plt.plot(X_test[i][0], X_test[i][1], '*r')
+    plt.show()
+    return {
+            'anomalies': anomalies}
@@ -0,0 +1,33 @@
+"""
+Startup-time benchmark of the anomaly detection modules.
+
+Every import is timed in a fresh interpreter, the time of an empty interpreter is
+subtracted so that only the cost of the import is reported.
+
+Usage: python bench_import.py [repeat]
+"""
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+MODULES = ['numpy', 'anomaly_detection', 'my_anomaly_detection']
+
+
+def startup_time(statement, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.check_call([sys.executable, '-c', statement])
+        times.append(time.perf_counter() - start)
+    return np.median(times)
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    base = startup_time('pass', repeat)
+    print('interpreter startup: %.1f ms' % (1000*base))
+    for module in MODULES:
+        t = startup_time('import ' + module, repeat)
+        print('import %-22s %.1f ms' % (module + ':', 1000*(t - base)))
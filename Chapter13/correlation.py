@@ -0,0 +1,51 @@
+"""
+Pairwise Pearson correlation and p-values of all the columns of a dataframe.
+
+The correlation matrix is computed with a single matrix product and the p-values
+with the t-distribution, vectorized on the upper triangle only and then mirrored.
+Shared by the analytics of Chapter 13 and Chapter 14.
+"""
+import numpy as np
+import pandas as pd
+
+
+def pearson_matrix(X):
+    """Correlation coefficients and two-sided p-values of the columns of the 2d array X,
+    the same of scipy.stats.pearsonr for every pair of columns."""
+    from scipy.stats import t as t_dist
+
+    X = np.asarray(X, dtype=np.float64)
+    n, k = X.shape
+    Xc = X - X.mean(axis=0)
+    norm = np.sqrt(np.einsum('ij,ij->j', Xc, Xc))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = np.dot(Xc.T, Xc) / np.outer(norm, norm)
+    r = np.clip(r, -1.0, 1.0)
+
+    # p-values on the upper triangle (diagonal included), then mirrored
+    iu = np.triu_indices(k)
+    r_u = r[iu]
+    dof = n - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = r_u * np.sqrt(dof / ((1.0 - r_u) * (1.0 + r_u)))
+    p_u = 2*t_dist.sf(np.abs(t), dof)
+    p = np.empty((k, k))
+    p[iu] = p_u
+    p.T[iu] = p_u
+    return r, p
+
+
+def calculate_pvalues(df, decimals=4):
+    """Matrix (dataframe) of the p-values of every pair of numeric columns."""
+    df = df.dropna()._get_numeric_data()
+    r, p = pearson_matrix(df.values)
+    return pd.DataFrame(np.round(p, decimals), index=df.columns, columns=df.columns)
+
+
+def calculate_pvalues_by(df, by='unitid', units=None, decimals=4):
+    """calculate_pvalues for many groups (e.g. engines) at once, return {unit: pvalues}.
+    The dataframe is split once instead of filtering it for every unit."""
+    if units is not None:
+        df = df[df[by].isin(units)]
+    return {unit: calculate_pvalues(group, decimals)
+            for unit, group in df.groupby(by, sort=True)}
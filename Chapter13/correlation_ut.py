@@ -0,0 +1,71 @@
+import unittest
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy.stats import pearsonr
+
+from correlation import pearson_matrix, calculate_pvalues, calculate_pvalues_by
+import my_anomaly_detection
+
+
+def expected_pvalues(df):
+    # the original loop over the pairs of columns
+    df = df.dropna()._get_numeric_data()
+    p = pd.DataFrame(index=df.columns, columns=df.columns, dtype=float)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for r in df.columns:
+            for c in df.columns:
+                p.loc[c, r] = round(pearsonr(df[r], df[c])[1], 4)
+    return p
+
+
+class MyTest(unittest.TestCase):
+    def setUp(self):
+        rnd = np.random.RandomState(0)
+        n = 50
+        x = rnd.randn(n)
+        self.df = pd.DataFrame({'unitid': np.repeat([1, 2], n // 2),
+                                'a': x,
+                                'b': x + rnd.randn(n),
+                                'c': rnd.randn(n),
+                                'constant': np.ones(n)})
+        self.df.loc[3, 'c'] = np.nan
+
+    def test_pearsonr(self):
+        X = self.df[['a', 'b', 'c', 'constant']].dropna().values
+        r, p = pearson_matrix(X)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            for i in range(3):
+                for j in range(3):
+                    expected = pearsonr(X[:, i], X[:, j])
+                    self.assertAlmostEqual(r[i, j], expected[0])
+                    self.assertAlmostEqual(p[i, j], expected[1])
+        # the diagonal
+        np.testing.assert_allclose(np.diag(r)[:3], 1)
+        np.testing.assert_array_equal(np.diag(p)[:3], 0)
+        # a constant column has no correlation
+        self.assertTrue(np.isnan(r[3]).all() and np.isnan(p[:, 3]).all())
+
+    def test_calculate_pvalues(self):
+        pd.testing.assert_frame_equal(calculate_pvalues(self.df), expected_pvalues(self.df))
+        pvalues = calculate_pvalues_by(self.df, 'unitid')
+        self.assertEqual(sorted(pvalues), [1, 2])
+        for unit, p in pvalues.items():
+            pd.testing.assert_frame_equal(p, expected_pvalues(self.df[self.df.unitid == unit]))
+        self.assertEqual(list(calculate_pvalues_by(self.df, 'unitid', units=[2])), [2])
+
+    def test_chapter13(self):
+        df = self.df[['a', 'b', 'c']].dropna()
+        corr = my_anomaly_detection.calculate_pvalues(df)
+        # the keys and the order of the original loop
+        self.assertListEqual(list(corr), ['a - a', 'b - a', 'c - a', 'b - b', 'c - b', 'c - c'])
+        for key, (r, p) in corr.items():
+            expected = pearsonr(df[key.split(' - ')[0]], df[key.split(' - ')[1]])
+            self.assertAlmostEqual(r, expected[0])
+            self.assertAlmostEqual(p, expected[1])
+
+if __name__ == '__main__':
+    unittest.main()
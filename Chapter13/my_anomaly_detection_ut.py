@@ -1,5 +1,5 @@
 import unittest
-from my_anomaly_detection import search_anomalies
+from my_anomaly_detection import search_anomalies, moving_average, StreamingAnomalyDetector
 import pandas as pd
 import numpy as np
 
@@ -12,5 +12,29 @@ class MyTest(unittest.TestCase):
         print(a)
         self.assertListEqual(a[1], [4,30])
 
+    def test_moving_average(self):
+        d=np.random.RandomState(0).rand(200)
+        for w in [1, 2, 5, 50]:
+            np.testing.assert_allclose(moving_average(d, w), np.convolve(d, np.ones(w)/w, 'same'))
+
+    def test_streaming(self):
+        d=np.random.RandomState(0).randn(1000)
+        d[[100, 500, 998]]=20
+        expected=search_anomalies(d, 10, sigma=4)['indices'].tolist()
+        # one point at a time, in micro-batches, in a single batch
+        detector=StreamingAnomalyDetector(window_size=10, sigma=4)
+        a=[i for y in d for i in detector.update(y)] + detector.flush()
+        for sizes in [[400, 600], [1000]]:
+            batches=StreamingAnomalyDetector(window_size=10, sigma=4)
+            b=[]
+            for start, size in zip(np.cumsum([0]+sizes), sizes):
+                b.extend(batches.update_many(d[start:start+size]))
+            b.extend(batches.flush())
+            self.assertListEqual(a, b)
+            self.assertAlmostEqual(batches.std, detector.std)
+        # the same points of search_anomalies, after the first points where the std is not known yet
+        self.assertListEqual([i for i in a if i > 50], [i for i in expected if i > 50])
+        self.assertIn(998, a)
+
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
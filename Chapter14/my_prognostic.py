@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 
+from unit_index import UnitIndex
+
 # step 1: read the dataset
 columns = ['unitid', 'time', 'set_1','set_2','set_3']
 columns.extend(['sensor_' + str(i) for i in range(1,22)])
@@ -10,34 +12,27 @@ df = pd.read_csv('./data/train_FD001.txt', delim_whitespace=True,names=columns)
 
 print(df.head())
 
+# index of the engines: rows sorted by unitid, one slice per engine
+index = UnitIndex(df)
+
 #step 2: EDA
 pd.set_option('display.max_columns', None)
 pd.set_option('display.max_rows', None)
-df_std = df.groupby('unitid').std()
+df_std = index.stats()['std']
 print(df_std==0)
 
-# removing unusefull data
-df=df.drop(['set_3', 'sensor_1', 'sensor_5', 'sensor_10', 'sensor_16', 'sensor_18', 'sensor_19'], axis=1)
-
-# correlation
-from scipy.stats import pearsonr
-def calculate_pvalues(df):
-    df = df.dropna()._get_numeric_data()
-    dfcols = pd.DataFrame(columns=df.columns)
-    pvalues = dfcols.transpose().join(dfcols, how='outer')
-    for r in df.columns:
-        for c in df.columns:
-            pvalues[r][c] = round(pearsonr(df[r], df[c])[1], 4)
-    return pvalues
+# removing unusefull data (constant for every engine):
+# 'set_3', 'sensor_1', 'sensor_5', 'sensor_10', 'sensor_16', 'sensor_18', 'sensor_19'
+df=index.df.drop(index.zero_variance(), axis=1)
+index = UnitIndex(df)
 
-print('correlation engine 1')
-print(calculate_pvalues(df[(df.unitid ==1)]))
+# correlation (shared with Chapter 13)
+import shared_modules
+from correlation import calculate_pvalues
 
-print('correlation engine 3')
-print(calculate_pvalues(df[(df.unitid ==5)]))
-
-print('correlation engine 10')
-print(calculate_pvalues(df[(df.unitid ==10)]))
+for i in [1, 5, 10]:
+    print('correlation engine %s' % i)
+    print(calculate_pvalues(index.unit(i)))
 
 # showing correlation
 import matplotlib.pyplot as plt
@@ -90,59 +85,7 @@ select_feature(df)
 
 
 # fit the model
-import math
-from keras.models import Sequential
-from keras.layers import Dense
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics import mean_squared_error
-
-
-def prepare_dataset(dataframe, columns):
-    dataframe = dataframe[columns]
-    dataset = dataframe.values
-    dataset = dataset.astype('float32')
-
-    # normalize the dataset
-    scaler = MinMaxScaler(feature_range=(0, 1))
-    dataset = scaler.fit_transform(dataset)
-    return dataset
-
-def build_model(input_dim):
-    # create model
-    model = Sequential()
-    model.add(Dense(16, input_dim=input_dim, activation='relu'))
-    model.add(Dense(32, activation='relu'))
-    model.add(Dense(1, activation='sigmoid'))
-
-    # Compile model
-    model.compile(loss='binary_crossentropy', optimizer='adam', metrics=['accuracy'])
-    return model
-
-def create_train_dataset(dataset):
-      dataX, dataY = [], []
-      start=len(dataset)
-      for i in range(len(dataset)):
-            a=dataset[i]
-            b=(start-i) / start
-            dataX.append(a)
-            dataY.append(b)
-            
-      return np.array(dataX), np.array(dataY)
-
-def train_model(model, dataset):
-
-    # create the dataset
-    trainX, trainY = create_train_dataset(dataset)
-
-    # Fit the model
-    model.fit(trainX, trainY, epochs=150, batch_size=10, verbose=0)
-    
-    # make predictions
-    trainPredict = model.predict(trainX)
-
-        # calculate root mean squared error
-    trainScore = math.sqrt(mean_squared_error(trainY, trainPredict[:,0]))
-    print('Train Score: %.2f RMSE' % (trainScore))
+from rul_model import fit_scaler, prepare_dataset, save_scaler, export_weights, build_model, train_model
 
 
 # prepare model
@@ -159,15 +102,22 @@ i=1
 model=build_model(len(columns_feature))
 
 # train the model
-dataset= prepare_dataset(df[(df.unitid ==i)],columns_feature)
+scaler = fit_scaler(index.unit(i),columns_feature)
+dataset= prepare_dataset(index.unit(i),columns_feature,scaler)
 train_model(model, dataset)
 
+# save the model and the scaling of the training data, as the SageMaker container of Chapter 15 does
+model.save('rul-model.h5')
+export_weights(model, 'rul-model.npz')
+save_scaler(scaler, columns_feature, 'rul-scaler.json')
+
 # test
 df_test = pd.read_csv('./data/test_FD001.txt', delim_whitespace=True,names=columns)
 expected = pd.read_csv('./data/RUL_FD001.txt', delim_whitespace=True,names=['RUL'])
+index_test = UnitIndex(df_test)
 
 n=len(dataset)
-dataset_test = prepare_dataset(df_test[(df_test.unitid ==i)],columns_feature)
+dataset_test = prepare_dataset(index_test.unit(i),columns_feature,scaler)
 testPredict = model.predict(dataset_test)
 testPredict = np.multiply(testPredict,n)
 print("RUL of Engine %s : predicted:%s expected:%s"%(1, testPredict[-1], expected['RUL'][i-1]))
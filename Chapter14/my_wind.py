@@ -1,23 +1,16 @@
 
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
 
+# the power curve is shared with the Azure ML scoring service of Chapter 15
+import shared_modules
+from power_curve import wind_turbine_model
+from wind_degradation import estimate_degradation, degradation_in_years, sample_points
 
-def wind_turbine_model(x):
+# load a sample of the data for the plot, the file is read in chunks
+df = sample_points('./data/wind_turbine.csv')
 
-    # cut-in pseed vs cut-out speed
-    if x<4.5 or x>21.5:
-        return 0
-
-    # standard operability
-    return 376.936 - 195.8161*x + 33.75734*x**2 - 2.212492*x**3 + 0.06309095*x**4 - 0.0006533647*x**5
-
-# load data
-df = pd.read_csv('./data/wind_turbine.csv')
-
-expected_power = [wind_turbine_model(x) for x in df.wind_speed_ms]
-reference_power = [wind_turbine_model(x) for x in range(0,30)]
+reference_power = wind_turbine_model(np.arange(0,30))
 
 # show data and reference
 fig, ax = plt.subplots()
@@ -27,19 +20,7 @@ ax.set_xlabel('wind speed (m/s)')
 ax.set_ylabel('power (kW)')
 plt.show()
 
-# evaluate ratio
-de=[]
-ts=[]
-for i in range(0,len(expected_power)):
-    mp = df.power_generated_kw[i]
-    ep = expected_power[i]
-    if ep>0 and mp>0:
-        t = df.cycle_10_mins[i]
-        de.append( (mp-ep) / ep )
-        ts.append(t)
-
-# predict degradation
-samples=365*24*6
+# evaluate ratio and predict degradation, reading the data in chunks
 year=9
-z = np.polyfit(ts, de, 1)
-print("degradation in %s years will be %.2f %%" % (year, 100*(z[0]*(samples*year) + z[1])) )
\ No newline at end of file
+estimator = estimate_degradation('./data/wind_turbine.csv')
+print("degradation in %s years will be %.2f %%" % (year, degradation_in_years(estimator, year)) )
@@ -0,0 +1,58 @@
+"""
+Training datasets for the RUL estimation.
+
+The target of every cycle is the fraction of life remaining, (n - i) / n, where n is
+the number of cycles of the engine and i the position of the cycle. The targets of all
+the engines are computed together with numpy arithmetic on the offsets of a UnitIndex.
+For sequence models the lookback windows are strided views of the dataset
+(sliding_window_view): no copy is done until a batch of windows is indexed.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def create_train_dataset(dataset):
+    """Dataset of a single engine: every row with its target (n - i) / n."""
+    start = len(dataset)
+    dataY = (start - np.arange(start)) / start
+    return np.asarray(dataset), dataY
+
+
+def rul_targets(starts, counts):
+    """Targets of all the engines, rows sorted by engine as in a UnitIndex."""
+    counts = np.asarray(counts)
+    n = np.repeat(counts, counts)
+    position = np.arange(n.size) - np.repeat(starts, counts)
+    return (n - position) / n
+
+
+def create_fleet_dataset(dataset, starts, counts):
+    """Rows and targets of all the engines at once (dataset sorted by engine)."""
+    return np.asarray(dataset), rul_targets(starts, counts)
+
+
+def create_window_dataset(dataset, starts, counts, lookback):
+    """Lookback windows of all the engines, without crossing from one engine to the next.
+
+    Returns (windows, index, dataY):
+        windows: view of shape (len(dataset) - lookback + 1, lookback, features), window w
+                 holds the rows w .. w + lookback - 1
+        index:   the windows that lie inside a single engine (none for an engine shorter than lookback)
+        dataY:   the target of the last cycle of every window in index
+    Use windows[index[batch]] to materialize only a batch of windows.
+    """
+    dataset = np.asarray(dataset)
+    starts = np.asarray(starts)
+    counts = np.asarray(counts)
+    if len(dataset) < lookback:
+        # no window at all, sliding_window_view would raise
+        windows = np.empty((0, lookback) + dataset.shape[1:], dtype=dataset.dtype)
+    else:
+        windows = sliding_window_view(dataset, lookback, axis=0).transpose(0, 2, 1)
+
+    # windows start from start .. stop - lookback of every engine
+    valid = np.maximum(counts - lookback + 1, 0)
+    index = np.arange(valid.sum()) + np.repeat(starts - (np.cumsum(valid) - valid), valid)
+
+    dataY = rul_targets(starts, counts)[index + lookback - 1]
+    return windows, index, dataY
@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+
+from rul_dataset import create_train_dataset, create_fleet_dataset, create_window_dataset
+
+
+class MyTest(unittest.TestCase):
+    def setUp(self):
+        # three engines, the second one shorter than the lookback
+        self.counts = np.array([6, 2, 5])
+        self.starts = np.cumsum(self.counts) - self.counts
+        self.dataset = np.arange(2 * self.counts.sum(), dtype=np.float64).reshape(-1, 2)
+
+    def test_fleet(self):
+        X, Y = create_fleet_dataset(self.dataset, self.starts, self.counts)
+        expected = np.concatenate([create_train_dataset(self.dataset[s:s + c])[1]
+                                   for s, c in zip(self.starts, self.counts)])
+        np.testing.assert_array_equal(X, self.dataset)
+        np.testing.assert_allclose(Y, expected)
+
+    def test_windows(self):
+        lookback = 3
+        windows, index, Y = create_window_dataset(self.dataset, self.starts, self.counts, lookback)
+        # the windows of every engine with a loop
+        expected_windows, expected_Y = [], []
+        for s, c in zip(self.starts, self.counts):
+            _, targets = create_train_dataset(self.dataset[s:s + c])
+            for i in range(c - lookback + 1):
+                expected_windows.append(self.dataset[s + i:s + i + lookback])
+                expected_Y.append(targets[i + lookback - 1])
+        self.assertEqual(len(index), 4 + 0 + 3)
+        np.testing.assert_array_equal(windows[index], np.array(expected_windows))
+        np.testing.assert_allclose(Y, expected_Y)
+
+    def test_short(self):
+        # a single engine shorter than the lookback: no window
+        windows, index, Y = create_window_dataset(self.dataset[:2], [0], [2], 3)
+        self.assertEqual(windows.shape, (0, 3, 2))
+        self.assertEqual((len(index), len(Y)), (0, 0))
+        self.assertEqual(windows[index].shape, (0, 3, 2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Fleet training of the RUL models: all the engines of one or more C-MAPSS training sets.
+
+Two modes:
+    packed    one model trained on all the engines together, every engine normalized
+              with its own min/max (normalize_by_unit)
+    per-unit  one model per engine, trained in parallel worker processes
+
+The models are saved in a registry directory (registry.json lists the model file,
+the scaler file, the number of cycles and the train RMSE of every engine) and the
+RMSE of every engine is reported in one table. The min/max of every engine are saved
+in rul-scaler-<unitid>.json, the rul-scaler.json format of the SageMaker container,
+to normalize the data of the engine at prediction time.
+
+Usage: python rul_fleet.py ./data/train_FD001.txt --mode per-unit --workers 8 --registry ./models
+"""
+import argparse
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import shared_modules
+from scaling import MinMaxScaling
+from unit_index import UnitIndex
+from rul_dataset import rul_targets
+from rul_model import build_model, normalize_by_unit, train_model
+
+# data columns
+columns = ['unitid', 'time', 'set_1','set_2','set_3']
+columns.extend(['sensor_' + str(i) for i in range(1,22)])
+
+# prepare model
+columns_feature=['sensor_4','sensor_7']
+
+
+def load_fleet(paths):
+    """Read the training sets, the engines of the n-th file get the unitid n*1000 + unitid."""
+    frames = []
+    for n, path in enumerate(paths):
+        df = pd.read_csv(path, sep=r'\s+', names=columns)
+        if len(paths) > 1:
+            df['unitid'] += (n + 1)*1000
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def save_scalers(index, registry):
+    """Save the min/max of every engine used by normalize_by_unit, return {unit: scaler file}."""
+    stats = index.stats(columns_feature)
+    scalers = {}
+    for unit, minimum, maximum in zip(index.units.tolist(), stats['min'].values, stats['max'].values):
+        name = 'rul-scaler-%s.json' % unit
+        MinMaxScaling(columns_feature, minimum, maximum).save(os.path.join(registry, name))
+        scalers[unit] = name
+    return scalers
+
+
+def train_packed(index, registry, epochs, batch_size):
+    """One model for the whole fleet, return {unit: (model file, rmse)}."""
+    np.random.seed(7)
+    trainX = normalize_by_unit(index, columns_feature)
+    trainY = rul_targets(index.starts, index.counts)
+
+    model = build_model(len(columns_feature))
+    model.fit(trainX, trainY, epochs=epochs, batch_size=batch_size, verbose=0)
+    model.save(os.path.join(registry, 'rul-model.h5'))
+
+    # RMSE of every engine with a grouped sum of the squared errors
+    error = (model.predict(trainX)[:,0] - trainY)**2
+    score = np.sqrt(np.add.reduceat(error, index.starts) / index.counts)
+    return {unit: ('rul-model.h5', s) for unit, s in zip(index.units.tolist(), score.tolist())}
+
+
+def _train_unit(unit, dataset, registry, epochs, batch_size):
+    """Worker: train and save the model of an engine."""
+    np.random.seed(7)
+    model = build_model(dataset.shape[1])
+    score = train_model(model, dataset, epochs=epochs, batch_size=batch_size)
+    name = 'rul-model-%s.h5' % unit
+    model.save(os.path.join(registry, name))
+    return unit, name, score
+
+
+def train_per_unit(index, registry, epochs, batch_size, workers):
+    """One model per engine in parallel processes, return {unit: (model file, rmse)}."""
+    dataset = normalize_by_unit(index, columns_feature)
+    units = index.units.tolist()
+    # spawn: every worker builds its own TensorFlow graph
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = [executor.submit(_train_unit, unit, dataset[start:stop], registry, epochs, batch_size)
+                   for unit, start, stop in zip(units, index.starts, index.stops)]
+        results = [f.result() for f in futures]
+    return {unit: (name, score) for unit, name, score in results}
+
+
+def save_registry(registry, mode, index, models, scalers):
+    report = pd.DataFrame({'unitid': index.units,
+                           'cycles': index.counts,
+                           'model': [models[u][0] for u in index.units.tolist()],
+                           'scaler': [scalers[u] for u in index.units.tolist()],
+                           'rmse': [models[u][1] for u in index.units.tolist()]})
+    with open(os.path.join(registry, 'registry.json'), 'w') as f:
+        json.dump({'mode': mode,
+                   'features': columns_feature,
+                   'models': report.to_dict(orient='records')}, f, indent=2, default=int)
+    report.to_csv(os.path.join(registry, 'rmse.csv'), index=False)
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('train', nargs='+', type=str, help='C-MAPSS training files (e.g. ./data/train_FD001.txt)')
+    parser.add_argument('--mode', choices=['packed', 'per-unit'], default='packed')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes of the per-unit mode (default: number of CPUs)')
+    parser.add_argument('--registry', type=str, default='./models', help='directory of the trained models')
+    parser.add_argument('--epochs', type=int, default=150)
+    parser.add_argument('--batch-size', type=int, default=10, dest='batch_size')
+    args = parser.parse_args()
+
+    os.makedirs(args.registry, exist_ok=True)
+    index = UnitIndex(load_fleet(args.train))
+    print('found %s engines' % len(index))
+
+    if args.mode == 'packed':
+        models = train_packed(index, args.registry, args.epochs, args.batch_size)
+    else:
+        models = train_per_unit(index, args.registry, args.epochs, args.batch_size, args.workers)
+
+    scalers = save_scalers(index, args.registry)
+    report = save_registry(args.registry, args.mode, index, models, scalers)
+    pd.set_option('display.max_rows', None)
+    print(report)
+    print('mean RMSE: %.4f' % report.rmse.mean())
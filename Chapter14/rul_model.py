@@ -0,0 +1,86 @@
+"""
+RUL estimation model of the book: a small dense network trained on the fraction
+of life remaining of the engines.
+
+Keras is imported by the functions that need it, so the module can be imported
+by the parent process of the fleet training without building a TensorFlow graph.
+"""
+import math
+
+import numpy as np
+
+import shared_modules
+from scaling import MinMaxScaling
+# the rul-model.npz format of the numpy backend of the SageMaker container
+from backends import export_weights
+from rul_dataset import create_train_dataset
+
+
+def fit_scaler(dataframe, columns):
+    """MinMaxScaler fitted once on the training data, to be reused for the test data."""
+    from sklearn.preprocessing import MinMaxScaler
+
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    scaler.fit(dataframe[columns].values.astype('float32'))
+    return scaler
+
+def prepare_dataset(dataframe, columns, scaler=None):
+    dataframe = dataframe[columns]
+    dataset = dataframe.values
+    dataset = dataset.astype('float32')
+
+    # normalize the dataset, with the scaler of the training data if given
+    if scaler is None:
+        scaler = fit_scaler(dataframe, columns)
+    return scaler.transform(dataset)
+
+def save_scaler(scaler, columns, path):
+    """Save the scaling parameters in the rul-scaler.json format of the SageMaker container."""
+    MinMaxScaling(columns, scaler.data_min_, scaler.data_max_, scaler.feature_range).save(path)
+
+def normalize_by_unit(index, columns):
+    """Normalize the columns in (0, 1) with the min/max of every engine, the same of
+    prepare_dataset applied to every engine, computed for the whole fleet at once.
+    Returns the float32 dataset, rows sorted by engine."""
+    stats = index.stats(columns)
+    minimum = stats['min'].values
+    data_range = stats['max'].values - minimum
+    # constant columns are mapped to 0 as MinMaxScaler does
+    scale = 1.0 / np.where(data_range == 0, 1.0, data_range)
+
+    dataset = index.values(columns)
+    dataset = (dataset - np.repeat(minimum, index.counts, axis=0)) * np.repeat(scale, index.counts, axis=0)
+    return dataset.astype('float32')
+
+def build_model(input_dim):
+    from keras.models import Sequential
+    from keras.layers import Dense
+
+    # create model
+    model = Sequential()
+    model.add(Dense(16, input_dim=input_dim, activation='relu'))
+    model.add(Dense(32, activation='relu'))
+    model.add(Dense(1, activation='sigmoid'))
+
+    # Compile model
+    model.compile(loss='binary_crossentropy', optimizer='adam', metrics=['accuracy'])
+    return model
+
+def train_model(model, dataset, epochs=150, batch_size=10):
+
+    # create the dataset
+    trainX, trainY = create_train_dataset(dataset)
+
+    # Fit the model
+    model.fit(trainX, trainY, epochs=epochs, batch_size=batch_size, verbose=0)
+
+    # make predictions
+    trainPredict = model.predict(trainX)
+
+    # calculate root mean squared error
+    trainScore = rmse(trainY, trainPredict[:,0])
+    print('Train Score: %.2f RMSE' % (trainScore))
+    return trainScore
+
+def rmse(expected, predicted):
+    return math.sqrt(np.mean((np.asarray(expected) - np.asarray(predicted))**2))
@@ -0,0 +1,24 @@
+"""
+Modules shared with the other chapters.
+
+Importing this module puts their folders on sys.path, built from the location of this file,
+so the scripts work from any working directory:
+
+    power_curve.py   Chapter15/azure_ml/wind_turbine, the power curve of the Azure ML scoring service
+    correlation.py   Chapter13, the p-values of the correlations
+    scaling.py       Chapter15/aws_sagemaker/container/rul, the rul-scaler.json format of the SageMaker container
+    backends.py      Chapter15/aws_sagemaker/container/rul, the rul-model.npz export of the SageMaker container
+"""
+import os
+import sys
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+paths = [os.path.join(here, '..', 'Chapter15', 'azure_ml', 'wind_turbine'),
+         os.path.join(here, '..', 'Chapter13'),
+         os.path.join(here, '..', 'Chapter15', 'aws_sagemaker', 'container', 'rul')]
+
+for path in paths:
+    path = os.path.normpath(path)
+    if path not in sys.path:
+        sys.path.append(path)
@@ -0,0 +1,68 @@
+"""
+Per-unit index of the C-MAPSS dataset.
+
+The dataframe is sorted once by unitid (stable, so the time order of every engine
+is kept) and the offsets of every unit are stored: the rows of an engine are then
+a slice instead of a boolean mask over the whole frame, and the grouped statistics
+are computed for all the engines together with np.add.reduceat and friends.
+"""
+import numpy as np
+import pandas as pd
+
+
+class UnitIndex(object):
+
+    def __init__(self, df, by='unitid'):
+        self.by = by
+        self.df = df.sort_values(by, kind='mergesort').reset_index(drop=True)
+        self.units, self.starts, self.counts = np.unique(self.df[by].values, return_index=True, return_counts=True)
+        self.stops = self.starts + self.counts
+        self._position = dict(zip(self.units.tolist(), range(len(self.units))))
+
+    def __len__(self):
+        return len(self.units)
+
+    def __iter__(self):
+        return iter(self.units)
+
+    def bounds(self, unit):
+        """(start, stop) rows of the unit in the sorted frame."""
+        i = self._position[unit]
+        return self.starts[i], self.stops[i]
+
+    def unit(self, unit, columns=None):
+        """Rows of the unit, sliced from the sorted frame (no full scan)."""
+        start, stop = self.bounds(unit)
+        rows = self.df.iloc[start:stop]
+        # the columns of the rows of the unit only, not of the whole frame
+        return rows if columns is None else rows[columns]
+
+    def values(self, columns, dtype=np.float64):
+        """The columns as a 2d array, rows sorted by unit."""
+        return self.df[columns].values.astype(dtype, copy=False)
+
+    def stats(self, columns=None):
+        """mean, std (ddof=1 like pandas), min and max of every unit in one grouped pass.
+        Returns a dict of dataframes indexed by unit."""
+        if columns is None:
+            columns = [c for c in self.df.columns if c != self.by]
+        X = self.values(columns)
+        counts = self.counts[:, None].astype(np.float64)
+
+        mean = np.add.reduceat(X, self.starts, axis=0) / counts
+        # variance on the centered values, more stable than sum of squares
+        centered = X - np.repeat(mean, self.counts, axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.sqrt(np.add.reduceat(centered*centered, self.starts, axis=0) / (counts - 1))
+        minimum = np.minimum.reduceat(X, self.starts, axis=0)
+        maximum = np.maximum.reduceat(X, self.starts, axis=0)
+
+        index = pd.Index(self.units, name=self.by)
+        return {name: pd.DataFrame(value, index=index, columns=columns)
+                for name, value in (('mean', mean), ('std', std), ('min', minimum), ('max', maximum))}
+
+    def zero_variance(self, columns=None):
+        """Columns that are constant inside every unit."""
+        stats = self.stats(columns)
+        constant = (stats['max'] == stats['min']).all()
+        return list(constant[constant].index)
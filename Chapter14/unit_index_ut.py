@@ -0,0 +1,38 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from unit_index import UnitIndex
+
+
+class MyTest(unittest.TestCase):
+    def setUp(self):
+        rnd = np.random.RandomState(0)
+        units = rnd.permutation(np.repeat([3, 1, 2], [5, 8, 4]))
+        self.df = pd.DataFrame({'unitid': units,
+                                'time': np.arange(len(units)),
+                                'sensor_1': rnd.rand(len(units)),
+                                'sensor_2': np.where(units == 1, 7.0, rnd.rand(len(units))),
+                                'set_1': np.ones(len(units))})
+        self.index = UnitIndex(self.df)
+
+    def test_unit(self):
+        for unit in [1, 2, 3]:
+            expected = self.df[self.df.unitid == unit]
+            np.testing.assert_array_equal(self.index.unit(unit)['time'].values, expected['time'].values)
+            pd.testing.assert_frame_equal(self.index.unit(unit, ['sensor_1', 'time']).reset_index(drop=True),
+                                          expected[['sensor_1', 'time']].reset_index(drop=True))
+
+    def test_stats(self):
+        columns = ['time', 'sensor_1', 'sensor_2', 'set_1']
+        stats = self.index.stats(columns)
+        grouped = self.df.groupby('unitid')[columns]
+        for name, expected in (('mean', grouped.mean()), ('std', grouped.std()),
+                               ('min', grouped.min()), ('max', grouped.max())):
+            pd.testing.assert_frame_equal(stats[name], expected.astype(np.float64), check_names=False)
+        self.assertEqual(self.index.zero_variance(columns), ['set_1'])
+        self.assertEqual(self.index.zero_variance(['sensor_2']), [])
+
+if __name__ == '__main__':
+    unittest.main()
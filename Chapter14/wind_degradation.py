@@ -0,0 +1,127 @@
+"""
+Streaming estimation of the wind turbine degradation.
+
+The CSV is read in chunks and only the sufficient statistics of the linear
+least-squares fit (count, means, co-moments) are kept in memory, so years of
+10-minute samples can be processed in one pass with constant memory.
+
+Usage: python wind_degradation.py ./data/wind_turbine.csv
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+# the power curve is shared with the Azure ML scoring service of Chapter 15
+import shared_modules
+from power_curve import wind_turbine_model
+
+# samples of 10 minutes in a year
+SAMPLES_PER_YEAR = 365*24*6
+
+CHUNK_SIZE = 100000
+
+
+class DegradationEstimator(object):
+    """Running least-squares fit of de = slope*t + intercept.
+
+    Chunks are merged with the pairwise update of means and co-moments, which gives
+    the same line of np.polyfit(ts, de, 1) without keeping ts and de in memory.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean_t = 0.0
+        self.mean_d = 0.0
+        self.m2_t = 0.0     # sum of (t - mean_t)**2
+        self.c_td = 0.0     # sum of (t - mean_t)*(d - mean_d)
+
+    def update(self, ts, de):
+        """Add a chunk of samples (arrays of timestamps and relative deviations)."""
+        ts = np.asarray(ts, dtype=np.float64)
+        de = np.asarray(de, dtype=np.float64)
+        n_b = len(ts)
+        if n_b == 0:
+            return self
+
+        mean_t_b = ts.mean()
+        mean_d_b = de.mean()
+        dt = ts - mean_t_b
+        m2_t_b = np.dot(dt, dt)
+        c_td_b = np.dot(dt, de - mean_d_b)
+
+        n = self.n + n_b
+        delta_t = mean_t_b - self.mean_t
+        delta_d = mean_d_b - self.mean_d
+        self.m2_t += m2_t_b + delta_t*delta_t*self.n*n_b/n
+        self.c_td += c_td_b + delta_t*delta_d*self.n*n_b/n
+        self.mean_t += delta_t*n_b/n
+        self.mean_d += delta_d*n_b/n
+        self.n = n
+        return self
+
+    def fit(self):
+        """Return (slope, intercept) like np.polyfit(ts, de, 1)."""
+        if self.n < 2 or self.m2_t == 0:
+            raise ValueError('at least two samples at different times are required')
+        slope = self.c_td / self.m2_t
+        return slope, self.mean_d - slope*self.mean_t
+
+    def predict(self, t):
+        slope, intercept = self.fit()
+        return slope*t + intercept
+
+
+def degradation_samples(df):
+    """Timestamps and relative deviations (measured-expected)/expected of a chunk,
+    only for the samples where the turbine is producing."""
+    mp = df.power_generated_kw.values
+    ep = wind_turbine_model(df.wind_speed_ms.values)
+    mask = (ep > 0) & (mp > 0)
+    ep = ep[mask]
+    return df.cycle_10_mins.values[mask], (mp[mask] - ep) / ep
+
+
+def estimate_degradation(path, chunksize=CHUNK_SIZE):
+    """Read the CSV of a turbine in chunks and return the fitted DegradationEstimator."""
+    estimator = DegradationEstimator()
+    reader = pd.read_csv(path, chunksize=chunksize,
+                         usecols=['cycle_10_mins', 'power_generated_kw', 'wind_speed_ms'])
+    for chunk in reader:
+        ts, de = degradation_samples(chunk)
+        estimator.update(ts, de)
+    return estimator
+
+
+def sample_points(path, max_points=20000, chunksize=CHUNK_SIZE, columns=('wind_speed_ms', 'power_generated_kw')):
+    """Every k-th row of the columns of the CSV, read in chunks, for plotting: k is doubled
+    whenever more than max_points rows are kept, so the memory stays bounded."""
+    stride = 1
+    kept = []
+    index = []
+    start = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize, usecols=list(columns)):
+        rows = np.arange(start, start + len(chunk))
+        start += len(chunk)
+        mask = rows % stride == 0
+        kept.append(chunk.values[mask])
+        index.append(rows[mask])
+        while sum(len(i) for i in index) > max_points:
+            stride *= 2
+            masks = [i % stride == 0 for i in index]
+            kept = [k[m] for k, m in zip(kept, masks)]
+            index = [i[m] for i, m in zip(index, masks)]
+    values = np.concatenate(kept) if kept else np.empty((0, len(columns)))
+    return pd.DataFrame(values, columns=list(columns))
+
+
+def degradation_in_years(estimator, year):
+    """Degradation (%) expected after the given number of years."""
+    return 100*estimator.predict(SAMPLES_PER_YEAR*year)
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else './data/wind_turbine.csv'
+    year = 9
+    estimator = estimate_degradation(path)
+    print("degradation in %s years will be %.2f %%" % (year, degradation_in_years(estimator, year)))
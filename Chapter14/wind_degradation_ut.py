@@ -0,0 +1,46 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from wind_degradation import DegradationEstimator, estimate_degradation, degradation_samples, sample_points
+
+
+class MyTest(unittest.TestCase):
+    def setUp(self):
+        rnd = np.random.RandomState(0)
+        n = 5000
+        speed = rnd.uniform(0, 25, n)
+        self.df = pd.DataFrame({'cycle_10_mins': np.arange(n),
+                                'wind_speed_ms': speed,
+                                'power_generated_kw': rnd.uniform(100, 3000, n)})
+        self.path = tempfile.mkdtemp()
+        self.csv = os.path.join(self.path, 'turbine.csv')
+        self.df.to_csv(self.csv, index=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_polyfit(self):
+        ts, de = degradation_samples(self.df)
+        expected = np.polyfit(ts, de, 1)
+        for chunksize in [7, 100, 10000]:
+            np.testing.assert_allclose(estimate_degradation(self.csv, chunksize=chunksize).fit(), expected)
+        estimator = DegradationEstimator()
+        for i in range(0, len(ts), 333):
+            estimator.update(ts[i:i+333], de[i:i+333])
+        np.testing.assert_allclose(estimator.fit(), expected)
+        self.assertRaises(ValueError, DegradationEstimator().update([1.0], [0.5]).fit)
+
+    def test_sample_points(self):
+        sample = sample_points(self.csv, max_points=600, chunksize=70)
+        self.assertLessEqual(len(sample), 600)
+        self.assertGreater(len(sample), 300)
+        # 5000 rows: every 16th row is kept
+        np.testing.assert_array_equal(sample.wind_speed_ms.values, pd.read_csv(self.csv).wind_speed_ms.values[::16])
+
+if __name__ == '__main__':
+    unittest.main()
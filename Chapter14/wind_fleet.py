@@ -0,0 +1,83 @@
+"""
+Fleet-wide degradation of the wind turbines.
+
+Every CSV (one per turbine, same format of ./data/wind_turbine.csv) is processed
+by a worker of a process pool with the streaming estimator of wind_degradation.py.
+The results are collected in a single report (CSV, or Parquet if the output ends with .parquet).
+
+Usage: python wind_fleet.py "./data/fleet/*.csv" --output report.csv --workers 8
+"""
+import argparse
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from wind_degradation import estimate_degradation, degradation_in_years, CHUNK_SIZE
+
+
+def turbine_files(source):
+    """CSV files of a directory, or files matching a glob pattern."""
+    if os.path.isdir(source):
+        source = os.path.join(source, '*.csv')
+    return sorted(glob.glob(source))
+
+
+def evaluate_turbine(path, year=9, chunksize=CHUNK_SIZE):
+    """Expected vs measured ratio and linear degradation trend of a turbine.
+    A file that cannot be evaluated (unreadable, too few samples) gives a row of NaN with the error."""
+    turbine = os.path.splitext(os.path.basename(path))[0]
+    try:
+        estimator = estimate_degradation(path, chunksize=chunksize)
+        slope, intercept = estimator.fit()
+    except (OSError, ValueError) as e:
+        # missing, unreadable or not a file (OSError), not parsable or too few samples (ValueError)
+        return {'turbine': turbine, 'samples': np.nan, 'mean_ratio': np.nan, 'slope': np.nan,
+                'intercept': np.nan, 'degradation_pct': np.nan, 'error': str(e)}
+    return {'turbine': turbine,
+            'samples': estimator.n,
+            'mean_ratio': 1 + estimator.mean_d,
+            'slope': slope,
+            'intercept': intercept,
+            'degradation_pct': degradation_in_years(estimator, year),
+            'error': ''}
+
+
+def evaluate_fleet(paths, workers=None, year=9, chunksize=CHUNK_SIZE):
+    """Evaluate all the turbines in parallel, return the report as a dataframe."""
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        rows = list(executor.map(evaluate_turbine, paths,
+                                 [year]*len(paths), [chunksize]*len(paths)))
+    return pd.DataFrame(rows, columns=['turbine', 'samples', 'mean_ratio', 'slope', 'intercept', 'degradation_pct',
+                                       'error'])
+
+
+def save_report(report, output):
+    if output.endswith('.parquet'):
+        report.to_parquet(output, index=False)
+    else:
+        report.to_csv(output, index=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('source', type=str, help='directory or glob pattern of the turbine CSV files')
+    parser.add_argument('--output', type=str, default='fleet_degradation.csv', help='report file (.csv or .parquet)')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: number of CPUs)')
+    parser.add_argument('--year', type=int, default=9, help='years of the degradation projection')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE, help='rows read at once from each CSV')
+    args = parser.parse_args()
+
+    paths = turbine_files(args.source)
+    if len(paths) == 0:
+        raise ValueError('There are no turbine files in %s' % args.source)
+    print('found %s turbines' % len(paths))
+
+    report = evaluate_fleet(paths, workers=args.workers, year=args.year, chunksize=args.chunksize)
+    save_report(report, args.output)
+    print(report)
+    failed = report[report.error != '']
+    if len(failed):
+        print('%s turbines could not be evaluated' % len(failed))
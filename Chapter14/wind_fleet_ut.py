@@ -0,0 +1,40 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from wind_fleet import evaluate_fleet, turbine_files
+
+
+class MyTest(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        rnd = np.random.RandomState(0)
+        n = 1000
+        pd.DataFrame({'cycle_10_mins': np.arange(n),
+                      'wind_speed_ms': rnd.uniform(0, 25, n),
+                      'power_generated_kw': rnd.uniform(100, 3000, n)}).to_csv(os.path.join(self.path, 'good.csv'),
+                                                                               index=False)
+        # a dangling link, a directory and a file that is not a turbine CSV
+        os.symlink(os.path.join(self.path, 'missing'), os.path.join(self.path, 'broken.csv'))
+        os.mkdir(os.path.join(self.path, 'folder.csv'))
+        with open(os.path.join(self.path, 'text.csv'), 'w') as f:
+            f.write('hello\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_bad_files(self):
+        report = evaluate_fleet(turbine_files(self.path), workers=2).set_index('turbine')
+        self.assertEqual(sorted(report.index), ['broken', 'folder', 'good', 'text'])
+        self.assertEqual(report.loc['good', 'error'], '')
+        self.assertGreater(report.loc['good', 'samples'], 0)
+        for turbine in ['broken', 'folder', 'text']:
+            self.assertNotEqual(report.loc[turbine, 'error'], '')
+            self.assertTrue(np.isnan(report.loc[turbine, 'slope']))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+# Inference backends of the RUL model.
+#
+# keras   the model saved by train (rul-model.h5), run by Keras/TensorFlow
+# numpy   the weights of the dense layers exported by train (rul-model.npz), run by a pure numpy
+#         evaluator: no TensorFlow is imported, so the workers start faster and use far less memory
+#
+# With MODEL_SERVER_BACKEND=auto (the default) the numpy backend is used when rul-model.npz exists.
+
+from __future__ import print_function
+
+import os
+
+import numpy as np
+
+keras_file = 'rul-model.h5'
+weights_file = 'rul-model.npz'
+
+activations = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    'sigmoid': lambda x: 1.0 / (1.0 + np.exp(-x)),
+    'tanh': np.tanh,
+}
+
+
+def export_weights(model, path):
+    """Save the kernels, biases and activations of the Dense layers of a Keras model in a .npz file."""
+    arrays = {}
+    names = []
+    for i, layer in enumerate(l for l in model.layers if l.get_weights()):
+        kernel, bias = layer.get_weights()
+        arrays['kernel_%d' % i] = kernel.astype('float32')
+        arrays['bias_%d' % i] = bias.astype('float32')
+        names.append(layer.get_config().get('activation', 'linear'))
+    np.savez(path, activations=np.array(names), **arrays)
+
+
+class KerasBackend(object):
+    name = 'keras'
+
+    def __init__(self, path):
+        import tensorflow as tf
+        from keras.models import load_model
+
+        self.model = load_model(os.path.join(path, keras_file))
+        # the graph of TensorFlow 1.x, the predictions run in it
+        self.graph = tf.get_default_graph() if hasattr(tf, 'get_default_graph') else None
+
+    def predict(self, input):
+        if self.graph is None:
+            return self.model.predict(input)
+        with self.graph.as_default():
+            return self.model.predict(input)
+
+    def summary(self):
+        self.model.summary()
+
+
+class NumpyBackend(object):
+    name = 'numpy'
+
+    def __init__(self, path):
+        with np.load(os.path.join(path, weights_file)) as f:
+            names = [str(a) for a in f['activations']]
+            self.layers = [(f['kernel_%d' % i], f['bias_%d' % i], activations[a]) for i, a in enumerate(names)]
+
+    def predict(self, input):
+        x = np.asarray(input, dtype='float32')
+        for kernel, bias, activation in self.layers:
+            x = np.dot(x, kernel)
+            x += bias
+            x = activation(x)
+        return x
+
+    def summary(self):
+        for i, (kernel, bias, activation) in enumerate(self.layers):
+            print('dense_%d: %s -> %s' % (i, kernel.shape[0], kernel.shape[1]))
+
+
+backends = {'keras': KerasBackend, 'numpy': NumpyBackend}
+
+
+def load_backend(path, name='auto'):
+    """The backend of the model saved in path."""
+    if name == 'auto':
+        name = 'numpy' if os.path.exists(os.path.join(path, weights_file)) else 'keras'
+    return backends[name](path)
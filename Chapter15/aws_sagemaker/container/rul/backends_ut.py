@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from backends import NumpyBackend, KerasBackend, export_weights, load_backend, keras_file, weights_file
+
+try:
+    import keras
+except ImportError:
+    keras = None
+
+
+def build_model(input_dim):
+    # the RUL model of train
+    from keras.models import Sequential
+    from keras.layers import Dense
+    model = Sequential()
+    model.add(Dense(16, input_dim=input_dim, activation='relu'))
+    model.add(Dense(32, activation='relu'))
+    model.add(Dense(1, activation='sigmoid'))
+    model.compile(loss='binary_crossentropy', optimizer='adam')
+    return model
+
+
+@unittest.skipIf(keras is None, 'keras is not installed')
+class MyTest(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        model = build_model(2)
+        x = np.random.RandomState(0).rand(200, 2).astype('float32')
+        model.fit(x, x.mean(axis=1), epochs=2, batch_size=20, verbose=0)
+        model.save(os.path.join(self.path, keras_file))
+        export_weights(model, os.path.join(self.path, weights_file))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_parity(self):
+        x = np.random.RandomState(1).rand(1000, 2).astype('float32')
+        expected = KerasBackend(self.path).predict(x)
+        predicted = NumpyBackend(self.path).predict(x)
+        self.assertEqual(predicted.shape, expected.shape)
+        np.testing.assert_allclose(predicted, expected, rtol=1e-5, atol=1e-6)
+
+    def test_auto(self):
+        self.assertEqual(load_backend(self.path).name, 'numpy')
+        os.remove(os.path.join(self.path, weights_file))
+        self.assertEqual(load_backend(self.path).name, 'keras')
+
+if __name__ == '__main__':
+    unittest.main()
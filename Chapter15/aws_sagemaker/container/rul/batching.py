@@ -0,0 +1,129 @@
+# Dynamic batching of the predictions.
+#
+# The requests served concurrently by a worker are queued; a background thread collects them
+# until max_rows rows are queued or the first request waited max_delay seconds, runs a single
+# predict on all the rows and gives every caller its own slice of the results.
+# Larger batches amortize the cost of the model call, a longer delay adds latency: the stats
+# (batch size, queue wait, predict time, rows/sec) are there to tune the trade-off.
+
+from __future__ import print_function
+
+import logging
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+import numpy as np
+
+logger = logging.getLogger('rul')
+
+
+class _Request(object):
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.enqueued = time.time()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher(object):
+
+    def __init__(self, predict, max_rows=1024, max_delay=0.005, log_every=1000):
+        self.predict_fn = predict
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.log_every = log_every
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.started = time.time()
+        self.requests = 0
+        self.batches = 0
+        self.rows = 0
+        self.max_batch_rows = 0
+        self.wait_time = 0.0        # total time spent by the requests in the queue
+        self.predict_time = 0.0     # total time spent in the model
+
+    def _start(self):
+        # the thread is started by the first request, i.e. in the gunicorn worker and not before fork
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='micro-batcher')
+                self.thread.daemon = True
+                self.thread.start()
+
+    def predict(self, dataset):
+        """Predictions of the rows of dataset, computed in a batch with the concurrent requests."""
+        if self.thread is None:
+            self._start()
+        request = _Request(dataset)
+        self.queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        rows = len(batch[0].dataset)
+        deadline = batch[0].enqueued + self.max_delay
+        while rows < self.max_rows:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                request = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(request)
+            rows += len(request.dataset)
+        return batch, rows
+
+    def _run(self):
+        while True:
+            batch, rows = self._collect()
+            start = time.time()
+            try:
+                results = self.predict_fn(np.concatenate([r.dataset for r in batch]))
+                # slices of the results, one per request
+                results = np.split(results, np.cumsum([len(r.dataset) for r in batch])[:-1])
+                for r, result in zip(batch, results):
+                    r.result = result
+            except Exception as e:
+                for r in batch:
+                    r.error = e
+            end = time.time()
+
+            self.requests += len(batch)
+            self.batches += 1
+            self.rows += rows
+            self.max_batch_rows = max(self.max_batch_rows, rows)
+            self.wait_time += sum(start - r.enqueued for r in batch)
+            self.predict_time += end - start
+            for r in batch:
+                r.done.set()
+
+            if self.log_every and self.batches % self.log_every == 0:
+                logger.info('micro-batching: %s', self.stats())
+
+    def stats(self):
+        batches = max(self.batches, 1)
+        requests = max(self.requests, 1)
+        return {'requests': self.requests,
+                'batches': self.batches,
+                'rows': self.rows,
+                'mean_batch_rows': float(self.rows) / batches,
+                'mean_batch_requests': float(self.requests) / batches,
+                'max_batch_rows': self.max_batch_rows,
+                'mean_wait_ms': 1000 * self.wait_time / requests,
+                'mean_predict_ms': 1000 * self.predict_time / batches,
+                'rows_per_sec': self.rows / max(time.time() - self.started, 1e-9)}
@@ -0,0 +1,64 @@
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from batching import MicroBatcher
+
+
+def call_concurrently(batcher, datasets):
+    """predict of every dataset in its own thread, return the results (or the exceptions)."""
+    results = [None] * len(datasets)
+
+    def call(i):
+        try:
+            results[i] = batcher.predict(datasets[i])
+        except Exception as e:
+            results[i] = e
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(datasets))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+class MyTest(unittest.TestCase):
+    def test_slices(self):
+        batcher = MicroBatcher(lambda x: x * 2, max_rows=1000, max_delay=0.1, log_every=0)
+        datasets = [np.full((i + 1, 2), i, dtype='float32') for i in range(8)]
+        results = call_concurrently(batcher, datasets)
+        for dataset, result in zip(datasets, results):
+            np.testing.assert_array_equal(result, dataset * 2)
+        stats = batcher.stats()
+        self.assertEqual((stats['requests'], stats['rows']), (8, 36))
+        self.assertLess(stats['batches'], 8)
+
+    def test_max_rows(self):
+        batcher = MicroBatcher(lambda x: x, max_rows=4, max_delay=1.0, log_every=0)
+        start = time.time()
+        call_concurrently(batcher, [np.zeros((2, 2))] * 6)
+        # the batches are sent as soon as they have 4 rows, without waiting max_delay
+        self.assertLess(time.time() - start, 1.0)
+        self.assertEqual(batcher.stats()['max_batch_rows'], 4)
+        self.assertEqual(batcher.stats()['batches'], 3)
+
+    def test_max_delay(self):
+        batcher = MicroBatcher(lambda x: x, max_rows=1000, max_delay=0.05, log_every=0)
+        start = time.time()
+        batcher.predict(np.zeros((1, 2)))
+        self.assertGreaterEqual(time.time() - start, 0.05)
+        self.assertLess(time.time() - start, 1.0)
+
+    def test_error(self):
+        def predict(x):
+            raise RuntimeError('model failed')
+        batcher = MicroBatcher(predict, max_rows=1000, max_delay=0.2, log_every=0)
+        results = call_concurrently(batcher, [np.zeros((1, 2))] * 3)
+        self.assertEqual(batcher.stats()['batches'], 1)
+        for result in results:
+            self.assertIsInstance(result, RuntimeError)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+# Counters and histograms of the inference server, exposed by /metrics in the Prometheus text format.
+#
+# Every gunicorn worker keeps its own metrics: a scrape of /metrics reports the worker that served it.
+
+from __future__ import print_function
+
+import threading
+import time
+from contextlib import contextmanager
+
+# seconds, from 0.5 ms to 10 s
+latency_buckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# rows
+size_buckets = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+registry = []
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (n, v) for n, v in zip(names, values))
+
+
+class Counter(object):
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def inc(self, amount=1, *labels):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.help), '# TYPE %s counter' % self.name]
+        for labels, value in sorted(self.values.items()):
+            lines.append('%s%s %s' % (self.name, _labels(self.labelnames, labels), value))
+        return lines
+
+
+class Histogram(object):
+
+    def __init__(self, name, help, buckets=latency_buckets, labelnames=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self.values = {}        # labels -> [bucket counts..., count, sum]
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def observe(self, value, *labels):
+        with self.lock:
+            v = self.values.get(labels)
+            if v is None:
+                v = self.values[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    v[i] += 1
+            v[-2] += 1
+            v[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(time.time() - start, *labels)
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.help), '# TYPE %s histogram' % self.name]
+        for labels, v in sorted(self.values.items()):
+            for i, bound in enumerate(self.buckets):
+                lines.append('%s_bucket%s %s' % (self.name, _labels(self.labelnames + ('le',), labels + (bound,)), v[i]))
+            lines.append('%s_bucket%s %s' % (self.name, _labels(self.labelnames + ('le',), labels + ('+Inf',)), v[-2]))
+            lines.append('%s_count%s %s' % (self.name, _labels(self.labelnames, labels), v[-2]))
+            lines.append('%s_sum%s %s' % (self.name, _labels(self.labelnames, labels), v[-1]))
+        return lines
+
+
+class Gauges(object):
+    """Gauges read when scraped from collect(), a function returning {name: value}."""
+
+    def __init__(self, prefix, help, collect):
+        self.prefix = prefix
+        self.help = help
+        self.collect = collect
+        registry.append(self)
+
+    def render(self):
+        lines = []
+        for name, value in sorted(self.collect().items()):
+            name = '%s_%s' % (self.prefix, name)
+            lines.extend(['# HELP %s %s' % (name, self.help), '# TYPE %s gauge' % name, '%s %s' % (name, value)])
+        return lines
+
+
+def render():
+    """All the metrics in the Prometheus text format."""
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# metrics of the RUL predictor
+requests = Counter('rul_requests_total', 'Requests to /invocations.', ['status'])
+rows = Counter('rul_rows_total', 'Rows scored.')
+stage_seconds = Histogram('rul_stage_seconds', 'Time spent in every stage of a request.', labelnames=['stage'])
+request_seconds = Histogram('rul_request_seconds', 'Time spent to serve a request.')
+request_rows = Histogram('rul_request_rows', 'Rows of a request.', buckets=size_buckets)
+batch_rows = Histogram('rul_batch_rows', 'Rows of a model call.', buckets=size_buckets)
@@ -0,0 +1,99 @@
+# Request and response formats of the /invocations endpoint.
+#
+# Content type                            Request                                        Response
+# ------------                            -------                                        --------
+# text/csv                                the C-MAPSS rows without header                rul per line
+# application/x-npy                       a 2d .npy array, all the C-MAPSS columns       .npy array (rul)
+#                                         or only the requested columns
+# application/vnd.apache.arrow.stream     Arrow IPC stream with named columns            Arrow IPC stream
+# application/x-parquet                   Parquet file with named columns                Parquet file
+#
+# The response has one row per engine, and the unitid column before rul with the query
+# parameter output=units (see predictor.py). The binary formats are read without copying the request bytes and only the requested
+# columns are read. pyarrow is needed only for the Arrow and Parquet formats.
+
+from __future__ import print_function
+
+import io
+
+import numpy as np
+import pandas as pd
+
+CSV = 'text/csv'
+NPY = 'application/x-npy'
+ARROW = 'application/vnd.apache.arrow.stream'
+PARQUET = 'application/x-parquet'
+
+content_types = [CSV, NPY, ARROW, PARQUET]
+
+# data columns
+columns = ['unitid', 'time', 'set_1','set_2','set_3']
+columns.extend(['sensor_' + str(i) for i in range(1,22)])
+
+
+def read_npy(body):
+    """Array of a .npy payload as a view on the request bytes."""
+    f = io.BytesIO(body)
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    count = int(np.prod(shape))
+    data = np.frombuffer(body, dtype=dtype, count=count, offset=f.tell())
+    return data.reshape(shape, order='F' if fortran_order else 'C')
+
+
+def decode(body, content_type, names):
+    """Dataframe with the columns names of the request."""
+    if content_type == CSV:
+        usecols = [columns.index(name) for name in names]
+        data = pd.read_csv(io.BytesIO(body), header=None, names=columns, usecols=usecols)
+        return data[names]
+
+    if content_type == NPY:
+        array = read_npy(body)
+        if array.ndim != 2:
+            raise ValueError('expected a 2d array, got shape %s' % (array.shape,))
+        if array.shape[1] == len(columns):
+            array = array[:, [columns.index(name) for name in names]]
+        elif array.shape[1] != len(names):
+            raise ValueError('expected %s or %s columns, got %s' % (len(columns), len(names), array.shape[1]))
+        return pd.DataFrame(array, columns=names, copy=False)
+
+    import pyarrow as pa
+    if content_type == ARROW:
+        table = pa.ipc.open_stream(pa.py_buffer(body)).read_all().select(names)
+    elif content_type == PARQUET:
+        import pyarrow.parquet as pq
+        table = pq.read_table(pa.BufferReader(body), columns=names)
+    else:
+        raise ValueError('unsupported content type %s' % content_type)
+    return table.to_pandas(split_blocks=True)
+
+
+def encode(results, content_type):
+    """Bytes of the response, results is a dataframe."""
+    if content_type == CSV:
+        out = io.StringIO()
+        results.to_csv(out, header=False, index=False)
+        return out.getvalue()
+
+    if content_type == NPY:
+        out = io.BytesIO()
+        np.save(out, results.values)
+        return out.getvalue()
+
+    import pyarrow as pa
+    table = pa.Table.from_pandas(results, preserve_index=False)
+    if content_type == ARROW:
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    if content_type == PARQUET:
+        import pyarrow.parquet as pq
+        sink = pa.BufferOutputStream()
+        pq.write_table(table, sink)
+        return sink.getvalue().to_pybytes()
+    raise ValueError('unsupported content type %s' % content_type)
@@ -0,0 +1,84 @@
+import io
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import payload
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+names = ['unitid', 'sensor_4', 'sensor_7']
+
+
+class MyTest(unittest.TestCase):
+    def setUp(self):
+        rnd = np.random.RandomState(0)
+        self.data = pd.DataFrame(rnd.rand(10, len(payload.columns)) * 100, columns=payload.columns)
+        self.data['unitid'] = np.repeat([1.0, 2.0], 5)
+        self.results = pd.DataFrame({'unitid': [1.0, 2.0], 'rul': [96.5, 12.25]})
+
+    def assert_decoded(self, body, content_type):
+        decoded = payload.decode(body, content_type, names)
+        self.assertListEqual(list(decoded.columns), names)
+        np.testing.assert_allclose(decoded.values, self.data[names].values)
+
+    def test_csv(self):
+        body = self.data.to_csv(header=False, index=False).encode('utf-8')
+        self.assert_decoded(body, payload.CSV)
+        response = payload.encode(self.results, payload.CSV)
+        pd.testing.assert_frame_equal(pd.read_csv(io.StringIO(response), header=None, names=['unitid', 'rul']),
+                                      self.results)
+
+    def test_npy(self):
+        for data in (self.data, self.data[names]):
+            out = io.BytesIO()
+            np.save(out, data.values)
+            self.assert_decoded(out.getvalue(), payload.NPY)
+        response = payload.encode(self.results, payload.NPY)
+        np.testing.assert_array_equal(np.load(io.BytesIO(response)), self.results.values)
+
+    @unittest.skipIf(pa is None, 'pyarrow is not installed')
+    def test_arrow(self):
+        table = pa.Table.from_pandas(self.data, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        self.assert_decoded(sink.getvalue().to_pybytes(), payload.ARROW)
+        response = payload.encode(self.results, payload.ARROW)
+        pd.testing.assert_frame_equal(pa.ipc.open_stream(pa.py_buffer(response)).read_all().to_pandas(),
+                                      self.results)
+
+    @unittest.skipIf(pa is None, 'pyarrow is not installed')
+    def test_parquet(self):
+        sink = pa.BufferOutputStream()
+        pq.write_table(pa.Table.from_pandas(self.data, preserve_index=False), sink)
+        self.assert_decoded(sink.getvalue().to_pybytes(), payload.PARQUET)
+        response = payload.encode(self.results, payload.PARQUET)
+        pd.testing.assert_frame_equal(pq.read_table(pa.BufferReader(response)).to_pandas(), self.results)
+
+    def test_malformed(self):
+        # the errors the predictor answers with 400
+        def npy(array):
+            out = io.BytesIO()
+            np.save(out, array)
+            return out.getvalue()
+        bodies = [(b'1,2,3\n4,5\n', payload.CSV),
+                  (b'not an npy', payload.NPY),
+                  (npy(np.zeros(5)), payload.NPY),
+                  (npy(np.zeros((4, 5))), payload.NPY)]
+        if pa is not None:
+            sink = pa.BufferOutputStream()
+            pq.write_table(pa.Table.from_pandas(self.data[['unitid']], preserve_index=False), sink)
+            bodies.extend([(b'not arrow', payload.ARROW),
+                           (b'not parquet', payload.PARQUET),
+                           (sink.getvalue().to_pybytes(), payload.PARQUET)])
+        for body, content_type in bodies:
+            self.assertRaises((ValueError, KeyError), payload.decode, body, content_type, names)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,21 +12,40 @@ except ImportError:
 import sys
 import signal
 import traceback
+import time
+import logging
+import itertools
 
 import flask
 
 import pandas as pd
 import numpy as np
-import tensorflow as tf
-from keras.models import load_model
 
 prefix = '/opt/ml/'
 model_path = os.path.join(prefix, 'model')
 
+# dynamic batching of the concurrent requests of a worker, disabled if MODEL_SERVER_BATCH_ROWS is 0
+batch_rows = int(os.environ.get('MODEL_SERVER_BATCH_ROWS', 0))
+batch_delay_ms = float(os.environ.get('MODEL_SERVER_BATCH_DELAY_MS', 5))
+
+# inference backend: numpy (exported weights, no TensorFlow), keras, or auto (numpy if rul-model.npz exists)
+backend_name = os.environ.get('MODEL_SERVER_BACKEND', 'auto').lower()
+
+# logging: level, and one request out of MODEL_SERVER_LOG_SAMPLE is logged at INFO
+log_level = os.environ.get('MODEL_SERVER_LOG_LEVEL', 'INFO').upper()
+log_sample = int(os.environ.get('MODEL_SERVER_LOG_SAMPLE', 100))
+logging.basicConfig(level=log_level, format='%(asctime)s %(process)d %(levelname)s %(name)s: %(message)s')
+logger = logging.getLogger('rul')
+served = itertools.count(1)
+
 #fit the model
 import math
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.metrics import mean_squared_error
+
+from scaling import MinMaxScaling, scaler_file
+import payload
+from batching import MicroBatcher
+from backends import load_backend
+import metrics
 
 # data columns
 columns = ['unitid', 'time', 'set_1','set_2','set_3']
@@ -35,8 +54,18 @@ columns.extend(['sensor_' + str(i) for i in range(1,22)])
 # prepare model
 columns_feature=['sensor_4','sensor_7']
 
+# cycles of life used to scale the predictions of the models trained without rul-cycles.json
+default_cycles = 192
+
 # RUL estimation functions
-def prepare_dataset(dataframe, columns=columns_feature):
+def prepare_dataset(dataframe, columns=columns_feature, scaling=None):
+    # apply the scaling fitted at training time
+    if scaling is not None:
+        return scaling.transform(dataframe)
+
+    # models trained without rul-scaler.json: normalize on the data of the request
+    from sklearn.preprocessing import MinMaxScaler
+
     dataframe = dataframe[columns]
     dataset = dataframe.values
     dataset = dataset.astype('float32')
@@ -50,20 +79,52 @@ def prepare_dataset(dataframe, columns=columns_feature):
 # It has a predict function that does a prediction based on the model and the input data.
 
 class ScoringService(object):
-    model = None                # Where we keep the model when it's loaded
-    graph = None
+    model = None                # Where we keep the model (its inference backend) when it's loaded
+    scaling = None              # The scaling fitted at training time
+    cycles = {'default': default_cycles, 'units': {}}   # The cycles of life of the engines
+    timings = {}                # Seconds spent to load the model and to warm it up
+
+    @classmethod
+    def load(cls):
+        """Load the model and warm it up with a dummy prediction. Called once at startup by wsgi.py
+        (in every worker, or in the gunicorn master when the app is preloaded), so no request pays for it."""
+        start = time.time()
+        logger.info('Loading model %s (backend %s) ...', model_path, backend_name)
+        model = load_backend(model_path, backend_name)
+        logger.info('model loaded with the %s backend', model.name)
+        model.summary()
+
+        scaler = os.path.join(model_path, scaler_file)
+        if os.path.exists(scaler):
+            cls.scaling = MinMaxScaling.load(scaler)
+            logger.info('scaling loaded')
+        else:
+            logger.warning('%s not found, every request is normalized on its own data', scaler)
+
+        cycles = os.path.join(model_path, 'rul-cycles.json')
+        if os.path.exists(cycles):
+            with open(cycles, 'r') as f:
+                cls.cycles = json.load(f)
+        loaded = time.time()
+
+        # the first predict builds the graph of the prediction
+        model.predict(np.zeros((1, len(columns_feature)), dtype='float32'))
+        warm = time.time()
+
+        cls.timings = {'load_seconds': loaded - start, 'warmup_seconds': warm - loaded}
+        logger.info('model ready: %s', cls.timings)
+        cls.model = model
+        return cls.model
+
+    @classmethod
+    def ready(cls):
+        return cls.model is not None
 
     @classmethod
     def get_model(cls):
         """Get the model object for this instance, loading it if it's not already loaded."""
-        if cls.model == None:
-            
-            inp = os.path.join(model_path, 'rul-model.h5')
-            print('Loading model %s ...' % inp)
-            cls.model = load_model(inp)
-            print('model loaded')
-            cls.graph = tf.get_default_graph()
-            print(cls.model.summary())
+        if cls.model is None:
+            cls.load()
         return cls.model
 
     @classmethod
@@ -74,53 +135,148 @@ class ScoringService(object):
             input (a pandas dataframe): The data on which to do the predictions. There will be
                 one prediction per row in the dataframe"""
 
-        lm = cls.get_model()
-        input = prepare_dataset(input)
-        with cls.graph.as_default():
-            return lm.predict(input)
+        cls.get_model()
+        with metrics.stage_seconds.time('normalize'):
+            input = prepare_dataset(input, scaling=cls.scaling)
+        batcher = get_batcher()
+        if batcher is not None:
+            return batcher.predict(input)
+        return cls.predict_batch(input)
+
+    @classmethod
+    def predict_batch(cls, input):
+        """Run the model on a (normalized) batch of rows."""
+        metrics.batch_rows.observe(len(input))
+        with metrics.stage_seconds.time('predict'):
+            return cls.model.predict(input)
+
+    @classmethod
+    def cycles_of(cls, units):
+        """Cycles of life of the engines, the default value for the engines not seen in training."""
+        known = cls.cycles['units']
+        default = cls.cycles['default']
+        return np.array([known.get('%g' % u, default) for u in units], dtype=np.float64)
+
+def rul_by_unit(unitid, predictions, cycles=None):
+    """Estimated RUL of every engine of the request: the prediction of the last row of the engine,
+    scaled by the cycles of life of the engine. The unit IDs are assumed to be the IDs of the training
+    engines (rul-cycles.json): the engines of another set, e.g. the C-MAPSS test set that numbers its
+    engines from 1 again, must give their cycles of life with cycles (the same for all the engines)."""
+    unitid = np.asarray(unitid)
+    # the last row of every engine is the first one of the reversed array
+    units, first = np.unique(unitid[::-1], return_index=True)
+    last = len(unitid) - 1 - first
+    if cycles is None:
+        cycles = ScoringService.cycles_of(units)
+    rul = np.asarray(predictions).reshape(-1)[last] * cycles
+    return pd.DataFrame({'unitid': units, 'rul': rul})
+
+# The batcher (its queue, lock and thread) is created by the first request of every worker process:
+# after the fork and after gevent patched threading and queue, never in the gunicorn master.
+_batchers = {}
+
+def get_batcher():
+    """The MicroBatcher of this process, None if the dynamic batching is disabled."""
+    if batch_rows <= 0:
+        return None
+    pid = os.getpid()
+    batcher = _batchers.get(pid)
+    if batcher is None:
+        # setdefault is atomic: two concurrent first requests get the same batcher, the other one
+        # is dropped before it starts its thread
+        batcher = _batchers.setdefault(pid, MicroBatcher(ScoringService.predict_batch, max_rows=batch_rows,
+                                                         max_delay=batch_delay_ms/1000.0))
+    return batcher
+
+def batcher_stats():
+    batcher = _batchers.get(os.getpid())
+    return batcher.stats() if batcher is not None else {}
+
+# throughput and latency of the micro-batching, to tune MODEL_SERVER_BATCH_ROWS and MODEL_SERVER_BATCH_DELAY_MS
+metrics.Gauges('rul_batcher', 'Micro-batching of the worker since its start (see batching.py).', batcher_stats)
 
 # The flask app for serving predictions
 app = flask.Flask(__name__)
 
 @app.route('/ping', methods=['GET'])
 def ping():
-    """Determine if the container is working and healthy. In this sample container, we declare
-    it healthy if we can load the model successfully."""
-    health = ScoringService.get_model() is not None  # You can insert a health check here
+    """Determine if the container is working and healthy. The container is healthy when the model
+    has been loaded and warmed up at startup: the ping never triggers the load."""
+    health = ScoringService.ready()
 
-    status = 200 if health else 404
-    return flask.Response(response='\n', status=status, mimetype='application/json')
+    status = 200 if health else 503
+    body = dict(ScoringService.timings, ready=health)
+    return flask.Response(response=json.dumps(body) + '\n', status=status, mimetype='application/json')
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Latency histograms of the stages of a request, requests and rows counters, batch sizes
+    in the Prometheus text format (metrics of the worker serving the scrape)."""
+    return flask.Response(response=metrics.render(), status=200, mimetype='text/plain; version=0.0.4')
+
+def invocation_response(response, status, mimetype):
+    metrics.requests.inc(1, str(status))
+    return flask.Response(response=response, status=status, mimetype=mimetype)
 
 @app.route('/invocations', methods=['POST'])
 def transformation():
-    """Do an inference on a single batch of data. In this sample server, we take data as CSV, convert
-    it to a pandas data frame for internal use and then convert the predictions back to CSV (which really
-    just means one prediction per line, since there's a single column.
+    """Do an inference on a single batch of data. The data can be CSV, .npy, Arrow IPC stream or
+    Parquet (see payload.py): only the unitid and the feature columns are read into a pandas data frame.
+    The rows of all the engines are scored together and the RUL of every engine is converted back to
+    the same format of the request: one rul per engine, as the original CSV response, or (unitid, rul)
+    with the query parameter output=units. The query parameter cycles=<n> gives the cycles of life of
+    the engines of the request, instead of the cycles of the training engines with the same unitid.
     """
-    data = None
+    start = time.time()
+    content_type = flask.request.mimetype
+    if content_type not in payload.content_types:
+        return invocation_response('This predictor supports %s data' % ', '.join(payload.content_types),
+                                   415, 'text/plain')
+    output = flask.request.args.get('output', 'rul')
+    if output not in ('rul', 'units'):
+        return invocation_response('output must be rul or units', 400, 'text/plain')
+    cycles = flask.request.args.get('cycles')
+    if cycles is not None:
+        try:
+            cycles = float(cycles)
+        except ValueError:
+            cycles = 0
+        if not (cycles > 0 and np.isfinite(cycles)):
+            return invocation_response('cycles must be a positive number', 400, 'text/plain')
 
-    # Convert from CSV to pandas
-    if flask.request.content_type == 'text/csv':
-        data = flask.request.data.decode('utf-8')
-        s = StringIO(data)
-        data = pd.read_csv(s, header=None,names=columns)
-    else:
-        return flask.Response(response='This predictor only supports CSV data', status=415, mimetype='text/plain')
+    with metrics.stage_seconds.time('decode'):
+        body = flask.request.get_data()
+    try:
+        with metrics.stage_seconds.time('parse'):
+            data = payload.decode(body, content_type, ['unitid'] + columns_feature)
+    except ImportError:
+        return invocation_response('%s needs pyarrow' % content_type, 415, 'text/plain')
+    except (ValueError, KeyError) as e:
+        return invocation_response(str(e), 400, 'text/plain')
+    if data.shape[0] == 0:
+        return invocation_response('The request has no rows', 400, 'text/plain')
 
-    print('Invoked with {} records'.format(data.shape[0]))
+    metrics.request_rows.observe(data.shape[0])
+    metrics.rows.inc(data.shape[0])
+    logger.debug('Invoked with %s records', data.shape[0])
 
-    # Do the prediction
+    # Do the prediction of all the engines with a single model call
     testPredict = ScoringService.predict(data)
-    print(testPredict)
 
-    #hardcoded
-    n=192
-    testPredict = np.multiply(testPredict,n)
-    print("RUL of Engine %s : predicted:%s expected:%s"%(1, testPredict[-1], 112))
+    # RUL of every engine
+    results = rul_by_unit(data['unitid'].values, testPredict, cycles)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('RUL:\n%s', results)
+    if output == 'rul':
+        results = results[['rul']]
+
+    # Convert from pandas back to the format of the request
+    with metrics.stage_seconds.time('serialize'):
+        result = payload.encode(results, content_type)
 
-    # Convert from numpy back to CSV
-    out = StringIO()
-    pd.DataFrame({'results':testPredict[-1]}).to_csv(out, header=False, index=False)
-    result = out.getvalue()
+    elapsed = time.time() - start
+    metrics.request_seconds.observe(elapsed)
+    if log_sample > 0 and next(served) % log_sample == 0:
+        logger.info('%s records, %s engines, %.1f ms', data.shape[0], len(results), 1000 * elapsed)
 
-    return flask.Response(response=result, status=200, mimetype='text/csv')
+    return invocation_response(result, 200, content_type)
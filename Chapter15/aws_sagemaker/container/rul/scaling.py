@@ -0,0 +1,55 @@
+# Min/max scaling of the features, fitted once at training time and saved next to the model
+# (rul-scaler.json), so that the predictor applies the same affine transform to every request
+# instead of refitting a MinMaxScaler on the data of the request.
+
+from __future__ import print_function
+
+import json
+
+import numpy as np
+
+scaler_file = 'rul-scaler.json'
+
+
+class MinMaxScaling(object):
+    """x * scale + offset, the same transform of sklearn MinMaxScaler."""
+
+    def __init__(self, columns, data_min, data_max, feature_range=(0, 1)):
+        self.columns = list(columns)
+        self.data_min = np.asarray(data_min, dtype=np.float64)
+        self.data_max = np.asarray(data_max, dtype=np.float64)
+        self.feature_range = tuple(feature_range)
+
+        data_range = self.data_max - self.data_min
+        # constant features are not scaled, as MinMaxScaler does
+        data_range[data_range == 0] = 1.0
+        scale = (self.feature_range[1] - self.feature_range[0]) / data_range
+        self.scale = scale.astype('float32')
+        self.offset = (self.feature_range[0] - self.data_min * scale).astype('float32')
+
+    @classmethod
+    def fit(cls, dataframe, columns, feature_range=(0, 1)):
+        dataset = dataframe[columns].values.astype('float32')
+        return cls(columns, dataset.min(axis=0), dataset.max(axis=0), feature_range)
+
+    def transform(self, dataset):
+        """Scale a float32 array of the features (a dataframe is restricted to the features)."""
+        if hasattr(dataset, 'columns'):
+            dataset = dataset[self.columns].values
+        dataset = np.array(dataset, dtype='float32')
+        dataset *= self.scale
+        dataset += self.offset
+        return dataset
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'columns': self.columns,
+                       'data_min': self.data_min.tolist(),
+                       'data_max': self.data_max.tolist(),
+                       'feature_range': list(self.feature_range)}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            params = json.load(f)
+        return cls(params['columns'], params['data_min'], params['data_max'], params['feature_range'])
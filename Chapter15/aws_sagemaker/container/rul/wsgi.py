@@ -5,3 +5,7 @@ import predictor as myapp
 # new file.
 
 app = myapp.app
+
+# Load and warm up the model at startup, not on the first request: in every worker at boot, or
+# once in the master before the workers are forked with gunicorn --preload (opt-in, see serve).
+myapp.ScoringService.load()
@@ -1,28 +1,98 @@
+import io
 import json
 import numpy as np
 import os
 import pickle
+import zipfile
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from azureml.core.model import Model
 
+# the raw HTTP request, needed by the binary requests: without it run() gets the body as a str
+try:
+    from azureml.contrib.services.aml_request import rawhttp
+    from azureml.contrib.services.aml_response import AMLResponse
+except ImportError:
+    rawhttp = None
 
-def wind_turbine_model(x):
+from power_curve import wind_turbine_model, power_curves
 
-    # cut-in speed vs cut-out speed
-    if x<4.5 or x>21.5:
-        return 0.0
-
-    # standard operability
-    return 376.936 - 195.8161*x + 33.75734*x**2 - 2.212492*x**3 + 0.06309095*x**4 - 0.0006533647*x**5
+# Requests
+#
+#   JSON   {"data": [speed, ...]}                  -> [power, ...]
+#          {"batch": [[speed, ...], ...]}          -> [[power, ...], ...]  (one series per turbine)
+#   binary .npz with the float64 arrays, Content-Type application/octet-stream
+#          data                                    -> power
+#          speeds, lengths                         -> power, lengths       (the series concatenated
+#                                                                           and the length of every series)
+#
+# The speeds of all the series of a batch are evaluated at once. The binary requests need the
+# raw HTTP entry point of azureml.contrib.services (@rawhttp): with an SDK without it Azure ML
+# passes the body to run() as a str and only the JSON requests are served.
+#
+# Both entry points answer the JSON requests as the original run() did: the JSON of the result is
+# returned as a string, that Azure ML encodes again. A malformed request is answered with 400 by the
+# raw HTTP entry point.
 
 def init():
     global model
     # not model for wind turbine
     model = wind_turbine_model
 
-def run(raw_data):
-    data = np.array(json.loads(raw_data)['data'])
-    # make evaluation
+def loads(raw_data):
+    if orjson is not None:
+        return orjson.loads(raw_data)
+    return json.loads(raw_data)
+
+def dumps(y):
+    if orjson is not None:
+        # the numpy arrays are serialized without converting them to lists of floats
+        return orjson.dumps(y, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+    if isinstance(y, list):
+        return json.dumps([a.tolist() for a in y])
+    return json.dumps(np.asarray(y).tolist())
+
+def run_binary(raw_data):
+    request = np.load(io.BytesIO(raw_data), allow_pickle=False)
+    response = io.BytesIO()
+    if 'data' in request:
+        np.savez(response, power=model(request['data']))
+    else:
+        lengths = request['lengths']
+        speeds = request['speeds']
+        if lengths.sum() != len(speeds):
+            raise ValueError('the lengths do not sum to the number of speeds')
+        np.savez(response, power=model(speeds), lengths=lengths)
+    return response.getvalue()
+
+def run_json(raw_data):
+    request = loads(raw_data)
+    if 'batch' in request:
+        # one vectorized evaluation for all the turbines
+        return dumps(power_curves(request['batch']))
+
+    data = np.array(request['data'])
+    # make evaluation on the whole array at once
     y = model(data)
-    return json.dumps(y)
+    return dumps(y)
+
+if rawhttp is not None:
+    @rawhttp
+    def run(request):
+        if request.method != 'POST':
+            return AMLResponse('POST the wind speeds', 405)
+        body = request.get_data(cache=False)
+        try:
+            if request.mimetype == 'application/octet-stream' or body[:2] == b'PK':
+                return AMLResponse(run_binary(body), 200, {'Content-Type': 'application/octet-stream'})
+            # the JSON string returned by the plain run(), JSON encoded as Azure ML does
+            return AMLResponse(json.dumps(run_json(body)), 200, {'Content-Type': 'application/json'})
+        except (ValueError, KeyError, TypeError, OSError, zipfile.BadZipFile) as e:
+            return AMLResponse('Bad request: {}'.format(e), 400)
+else:
+    def run(raw_data):
+        return run_json(raw_data)
@@ -0,0 +1,106 @@
+import unittest
+import importlib
+import io
+import json
+import sys
+import types
+import numpy as np
+from power_curve import wind_turbine_model
+
+
+class Request(object):
+    method = 'POST'
+
+    def __init__(self, body, mimetype):
+        self.body = body
+        self.mimetype = mimetype
+
+    def get_data(self, cache=True):
+        return self.body
+
+
+def load_core(raw):
+    # azureml is not needed to score: stub modules, with rawhttp and AMLResponse (as a tuple) if raw
+    names = ['azureml', 'azureml.core', 'azureml.core.model', 'azureml.contrib', 'azureml.contrib.services',
+             'azureml.contrib.services.aml_request', 'azureml.contrib.services.aml_response']
+    saved = {name: sys.modules.get(name) for name in names + ['core']}
+    try:
+        for name in ['azureml', 'azureml.core', 'azureml.core.model']:
+            sys.modules[name] = types.ModuleType(name)
+        sys.modules['azureml.core.model'].Model = None
+        for name in names[3:]:
+            if raw:
+                sys.modules[name] = types.ModuleType(name)
+            else:
+                # the import fails, as with an SDK without azureml.contrib.services
+                sys.modules[name] = None
+        if raw:
+            sys.modules['azureml.contrib.services.aml_request'].rawhttp = lambda f: f
+            sys.modules['azureml.contrib.services.aml_response'].AMLResponse = lambda *args: args
+        sys.modules.pop('core', None)
+        core = importlib.import_module('core')
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+    core.init()
+    return core
+
+
+def npz(**arrays):
+    body = io.BytesIO()
+    np.savez(body, **arrays)
+    return body.getvalue()
+
+
+class MyTest(unittest.TestCase):
+    speeds = [3.0, 10.0, 16.0, 25.0]
+
+    def test_run_json(self):
+        core = load_core(False)
+        power = json.loads(core.run(json.dumps({'data': self.speeds})))
+        np.testing.assert_allclose(power, wind_turbine_model(np.array(self.speeds)))
+        curves = json.loads(core.run(json.dumps({'batch': [self.speeds[:1], self.speeds[1:]]})))
+        self.assertEqual(len(curves), 2)
+        np.testing.assert_allclose(curves[1], wind_turbine_model(np.array(self.speeds[1:])))
+
+    def test_run_raw_json(self):
+        core = load_core(True)
+        body, status, headers = core.run(Request(json.dumps({'data': self.speeds}).encode('utf-8'),
+                                                 'application/json'))
+        self.assertEqual(status, 200)
+        # the same contract of the plain entry point: a JSON string with the JSON of the powers
+        self.assertEqual(json.loads(body), core.run_json(json.dumps({'data': self.speeds})))
+        np.testing.assert_allclose(json.loads(json.loads(body)), wind_turbine_model(np.array(self.speeds)))
+
+    def test_run_binary(self):
+        core = load_core(True)
+        body, status, headers = core.run(Request(npz(data=np.array(self.speeds)), 'application/octet-stream'))
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Type'], 'application/octet-stream')
+        np.testing.assert_allclose(np.load(io.BytesIO(body))['power'], wind_turbine_model(np.array(self.speeds)))
+
+        body, status, headers = core.run(Request(npz(speeds=np.array(self.speeds), lengths=np.array([1, 3])),
+                                                 'application/octet-stream'))
+        self.assertEqual(status, 200)
+        response = np.load(io.BytesIO(body))
+        np.testing.assert_allclose(response['power'], wind_turbine_model(np.array(self.speeds)))
+        np.testing.assert_array_equal(response['lengths'], [1, 3])
+
+    def test_bad_request(self):
+        core = load_core(True)
+        bodies = [(npz(speeds=np.array(self.speeds)), 'application/octet-stream'),  # no lengths
+                  (npz(speeds=np.array(self.speeds), lengths=np.array([1, 2])), 'application/octet-stream'),
+                  (b'not an npz', 'application/octet-stream'),
+                  (b'PK truncated', 'application/octet-stream'),
+                  (b'{"data": ', 'application/json'),
+                  (b'{"speeds": [3]}', 'application/json')]
+        for body, mimetype in bodies:
+            response = core.run(Request(body, mimetype))
+            self.assertEqual(response[1], 400, body)
+
+
+if __name__ == '__main__':
+    unittest.main()
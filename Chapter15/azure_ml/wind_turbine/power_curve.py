@@ -0,0 +1,49 @@
+"""
+Power curve of the wind turbine (physics-based model).
+
+This module is shared by the Azure ML scoring script (core.py), the training
+script (train.py) and the Chapter 14 analytics (my_wind.py). When deploying
+core.py remember to ship this file too, e.g.
+ContainerImage.image_configuration(execution_script="core.py", dependencies=["power_curve.py"], ...)
+"""
+import numpy as np
+
+# cut-in speed vs cut-out speed (m/s)
+CUT_IN_SPEED = 4.5
+CUT_OUT_SPEED = 21.5
+
+# coefficients of the standard operability curve, highest degree first:
+# 376.936 - 195.8161*x + 33.75734*x**2 - 2.212492*x**3 + 0.06309095*x**4 - 0.0006533647*x**5
+COEFFICIENTS = (-0.0006533647, 0.06309095, -2.212492, 33.75734, -195.8161, 376.936)
+
+
+def wind_turbine_model(x):
+    """Expected power (kW) of the turbine for the wind speed x (m/s).
+
+    x can be a scalar or an array-like of any shape: the whole array is evaluated at once.
+    Returns a float for a scalar input, a numpy array otherwise.
+    """
+    x = np.asarray(x, dtype=np.float64)
+
+    # standard operability, evaluated with Horner's rule
+    y = np.full(x.shape, COEFFICIENTS[0])
+    for c in COEFFICIENTS[1:]:
+        y *= x
+        y += c
+
+    # cut-in speed vs cut-out speed
+    y[(x < CUT_IN_SPEED) | (x > CUT_OUT_SPEED)] = 0.0
+
+    if y.ndim == 0:
+        return float(y)
+    return y
+
+
+def power_curves(series):
+    """Power curves of many turbines: series is a list of wind speed series (of any length),
+    the result is the list of the power series. All the speeds are evaluated at once."""
+    series = [np.asarray(s, dtype=np.float64).reshape(-1) for s in series]
+    if not series:
+        return []
+    y = wind_turbine_model(np.concatenate(series))
+    return np.split(y, np.cumsum([len(s) for s in series])[:-1])
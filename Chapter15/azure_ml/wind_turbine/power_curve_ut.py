@@ -0,0 +1,37 @@
+import unittest
+from power_curve import wind_turbine_model, power_curves
+import numpy as np
+
+
+def scalar_wind_turbine_model(x):
+
+    # cut-in speed vs cut-out speed
+    if x<4.5 or x>21.5:
+        return 0.0
+
+    # standard operability
+    return 376.936 - 195.8161*x + 33.75734*x**2 - 2.212492*x**3 + 0.06309095*x**4 - 0.0006533647*x**5
+
+
+class MyTest(unittest.TestCase):
+    def test_scalar(self):
+        self.assertEqual(wind_turbine_model(3), 0.0)
+        self.assertEqual(wind_turbine_model(25), 0.0)
+        self.assertAlmostEqual(wind_turbine_model(16), scalar_wind_turbine_model(16))
+
+    def test_array(self):
+        x=np.linspace(0, 30, 601)
+        y=wind_turbine_model(x)
+        self.assertEqual(y.shape, x.shape)
+        np.testing.assert_allclose(y, [scalar_wind_turbine_model(v) for v in x], atol=1e-9)
+
+    def test_batch(self):
+        series=[np.linspace(0, 30, 61), [], [16.0], np.arange(3, 9)]
+        curves=power_curves(series)
+        self.assertEqual([len(c) for c in curves], [61, 0, 1, 6])
+        for s, c in zip(series, curves):
+            np.testing.assert_allclose(c, [scalar_wind_turbine_model(v) for v in s], atol=1e-9)
+        self.assertEqual(power_curves([]), [])
+
+if __name__ == '__main__':
+    unittest.main()
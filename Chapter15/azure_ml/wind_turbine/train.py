@@ -1,22 +1,19 @@
 import argparse
+import glob
+import json
 import os
 import numpy as np
+import pandas as pd
 
-from sklearn.linear_model import LogisticRegression
-from sklearn.externals import joblib
+# scikit-learn >= 1.1 (SGDClassifier with loss='log_loss')
+import joblib
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
 
 from azureml.core import Run
-import random
-
-def wind_turbine_model(x):
-
-    # cut-in pseed vs cut-out speed
-    if x<4.5 or x>21.5:
-        return 0.0
-
-    # standard operability
-    return 376.936 - 195.8161*x + 33.75734*x**2 - 2.212492*x**3 + 0.06309095*x**4 - 0.0006533647*x**5
 
+from power_curve import wind_turbine_model
 
 # get hold of the current run
 run = Run.get_context()
@@ -25,38 +22,124 @@ run = Run.get_context()
 parser = argparse.ArgumentParser()
 parser.add_argument('--data-folder', type=str, dest='data_folder', help='data folder mounting point')
 parser.add_argument('--regularization', type=float, dest='reg', default=0.01, help='regularization rate')
+# incremental mode: the labelled data (csv files with the columns speed, power, label) not seen yet
+# by the model saved in outputs are read in chunks and used to update it
+parser.add_argument('--incremental', action='store_true', help='update the saved model with the new data files')
+parser.add_argument('--chunk-size', type=int, dest='chunk_size', default=100000, help='rows read at a time')
+parser.add_argument('--checkpoint-every', type=int, dest='checkpoint_every', default=10, help='chunks between checkpoints')
 args = parser.parse_args()
 
 data_folder = os.path.join(args.data_folder, 'mnist')
 print('Data folder:', data_folder)
 
-
-X_train=[]
-y_train=[]
-
-
-X_train.extend( [[x ,wind_turbine_model(x)] for x in range(0,30)] )
-y_train.extend( [1 for x in range(0,30)] )
+model_file = 'outputs/sklearn_windturbine_model.pkl'
+# the checkpoint of the incremental model (scaler and classifier), not overwritten by the batch training
+checkpoint_file = 'outputs/sklearn_windturbine_incremental.pkl'
+# the data files already used to train the model of checkpoint_file, and the rows learned of the file being read
+state_file = 'outputs/sklearn_windturbine_state.json'
+classes = np.array([0, 1])
+# the name of the synthetic data in the consumed files, learned once when there are no data files
+synthetic = '<synthetic>'
+
+
+def synthetic_training_set():
+    # the power curve is normal operation, random low power at high speed is not
+    speeds = np.arange(0, 30)
+    low = np.arange(15, 30)
+    X = np.concatenate((np.column_stack((speeds, wind_turbine_model(speeds))),
+                        np.column_stack((low, 50 + low*np.random.random(len(low))))))
+    y = np.concatenate((np.ones(len(speeds), dtype=int), np.zeros(len(low), dtype=int)))
+    return X, y
+
+
+def empty_state():
+    return {'consumed': [], 'current': None, 'rows': 0}
+
+
+def load_checkpoint():
+    """The model and its state (the data files consumed, the rows learned of the current file),
+    a new model if there is no checkpoint."""
+    if not os.path.exists(checkpoint_file):
+        model = make_pipeline(StandardScaler(), SGDClassifier(loss='log_loss', alpha=args.reg, random_state=0))
+        return model, empty_state()
+    # copy-on-write memory map: the arrays of the model are not read into memory up front
+    # and the updates do not touch the checkpoint file
+    model = joblib.load(checkpoint_file, mmap_mode='c')
+    # the state is saved in the model file, so the two always match
+    return model, dict(empty_state(), **getattr(model, 'training_state', {}))
+
+
+def save_checkpoint(model, state):
+    # write and rename, a job killed while saving does not leave a broken checkpoint
+    os.makedirs('outputs', exist_ok=True)
+    model.training_state = state
+    joblib.dump(model, checkpoint_file + '.tmp')
+    os.replace(checkpoint_file + '.tmp', checkpoint_file)
+    # a readable copy of the state
+    with open(state_file + '.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(state_file + '.tmp', state_file)
+
+
+def partial_fit(model, X, y):
+    scaler, classifier = model.steps[0][1], model.steps[-1][1]
+    scaler.partial_fit(X)
+    classifier.partial_fit(scaler.transform(X), y, classes=classes)
+
+
+def train_incremental():
+    model, state = load_checkpoint()
+    consumed = state['consumed']
+    files = [f for f in sorted(glob.glob(os.path.join(data_folder, '*.csv'))) if f not in consumed]
+    print('Consumed files:', len(consumed), 'new files:', len(files))
+    if not consumed and not files:
+        # nothing to learn from: start from the synthetic data of the batch training, once
+        partial_fit(model, *synthetic_training_set())
+        consumed.append(synthetic)
+        save_checkpoint(model, state)
+
+    rows = 0
+    chunks = 0
+    for path in files:
+        # the rows of the file learned before the last checkpoint are skipped, the header is kept
+        skip = state['rows'] if state['current'] == path else 0
+        state['current'], state['rows'] = path, skip
+        if skip:
+            print('Resuming', path, 'after', skip, 'rows')
+        for chunk in pd.read_csv(path, usecols=['speed', 'power', 'label'], chunksize=args.chunk_size,
+                                 skiprows=range(1, skip + 1)):
+            partial_fit(model, chunk[['speed', 'power']].values.astype(np.float64), chunk['label'].values)
+            rows += len(chunk)
+            state['rows'] += len(chunk)
+            chunks += 1
+            if chunks % args.checkpoint_every == 0:
+                save_checkpoint(model, state)
+        consumed.append(path)
+        state['current'], state['rows'] = None, 0
+        save_checkpoint(model, state)
+    print('Rows learned:', rows)
+    run.log('rows', rows)
+    return model
+
+
+if args.incremental:
+    model = train_incremental()
+else:
+    X_train, y_train = synthetic_training_set()
+    model = LogisticRegression(C=1.0/args.reg, random_state=0, solver='lbfgs')
+    model.fit(X_train, y_train)
+
+test=model.predict([[16,wind_turbine_model(16)],[1,wind_turbine_model(1)],[25,wind_turbine_model(25)],[25,50],[18,250]])
 
 
-for x in range(15,30):
-    X_train.extend([[x, 50 + x*random.random()]])
-    y_train.extend([0])
-
-logreg = LogisticRegression(C=1.0/args.reg, random_state=0, solver='lbfgs', multi_class='multinomial')
-logreg.fit(X_train, y_train)
-
-test=logreg.predict([[16,wind_turbine_model(16)],[1,wind_turbine_model(1)],[25,wind_turbine_model(25)],[25,50],[18,250]])
-
-
-import numpy as np
 # calculate accuracy on the prediction
 acc = np.average(test == [1,1,1,0,1])
 print('Accuracy is', acc)
 
-run.log('regularization rate', np.float(args.reg))
-run.log('accuracy', np.float(acc))
+run.log('regularization rate', float(args.reg))
+run.log('accuracy', float(acc))
 
-os.makedirs('outputs', exist_ok=True)
-# note file saved in the outputs folder is automatically uploaded into experiment record
-joblib.dump(value=logreg, filename='outputs/sklearn_windturbine_model.pkl')
\ No newline at end of file
+if not args.incremental:
+    os.makedirs('outputs', exist_ok=True)
+    # note file saved in the outputs folder is automatically uploaded into experiment record
+    joblib.dump(value=model, filename=model_file)
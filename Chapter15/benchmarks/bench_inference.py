@@ -0,0 +1,220 @@
+"""
+Load test of the inference services of Chapter 15, run locally with stub models.
+
+    rul-inprocess   the Flask app of the SageMaker container, driven in-process (stub_wsgi.py)
+    rul-gunicorn    the same app served by gunicorn on localhost, driven over HTTP
+    azure-run       run() of the Azure ML scoring script (core.py), called in-process
+
+Every target is run at several concurrency levels and payload sizes, after a few warm-up
+requests that are not timed; the latency percentiles (p50/p95/p99), requests/sec and rows/sec
+are printed and written as JSON. gunicorn runs gevent workers as serve does, if gevent is installed.
+
+Usage: python bench_inference.py --targets rul-inprocess rul-gunicorn azure-run \
+           --concurrency 1 4 16 --rows 1 100 10000 --requests 200 --output results.json
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import types
+
+import numpy as np
+import pandas as pd
+
+here = os.path.dirname(os.path.abspath(__file__))
+data_path = os.path.join(here, '..', 'aws_sagemaker', 'train_FD001.txt')
+azure_path = os.path.join(here, '..', 'azure_ml', 'wind_turbine')
+
+os.environ.setdefault('MODEL_SERVER_LOG_SAMPLE', '0')
+os.environ.setdefault('MODEL_SERVER_LOG_LEVEL', 'WARNING')
+
+
+def rul_payload(rows):
+    """CSV body of the given number of C-MAPSS rows (of many engines)."""
+    df = pd.read_csv(data_path, sep=r'\s+', header=None)
+    df = df.iloc[np.arange(rows) % len(df)]
+    return df.to_csv(header=False, index=False).encode('utf-8')
+
+
+def azure_payload(rows):
+    speeds = np.random.RandomState(0).uniform(0, 30, rows)
+    return json.dumps({'data': speeds.tolist()})
+
+
+def run_load(call, concurrency, requests, warmup=10):
+    """Run requests calls split among concurrency threads, return the latencies and the wall time.
+    warmup calls per thread are run first and not timed."""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    per_thread = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+
+    def worker(n):
+        for _ in range(warmup):
+            try:
+                call()
+            except Exception:
+                pass
+        local = []
+        for _ in range(n):
+            start = time.perf_counter()
+            try:
+                call()
+            except Exception as e:
+                with lock:
+                    errors.append(repr(e))
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in per_thread]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return np.array(latencies), time.perf_counter() - start, errors
+
+
+def summarize(target, concurrency, rows, latencies, wall, errors):
+    ms = 1000 * latencies if len(latencies) else np.array([np.nan])
+    return {'target': target,
+            'concurrency': concurrency,
+            'rows': rows,
+            'requests': len(latencies),
+            'errors': len(errors),
+            'p50_ms': float(np.percentile(ms, 50)),
+            'p95_ms': float(np.percentile(ms, 95)),
+            'p99_ms': float(np.percentile(ms, 99)),
+            'requests_per_sec': len(latencies) / wall,
+            'rows_per_sec': rows * len(latencies) / wall}
+
+
+def bench_rul_inprocess(concurrency, rows, requests):
+    import stub_wsgi
+    body = rul_payload(rows)
+    local = threading.local()
+
+    def call():
+        if not hasattr(local, 'client'):
+            local.client = stub_wsgi.app.test_client()
+        r = local.client.post('/invocations', data=body, content_type='text/csv')
+        if r.status_code != 200:
+            raise RuntimeError('status %s' % r.status_code)
+
+    return run_load(call, concurrency, requests)
+
+
+class Gunicorn(object):
+    """gunicorn serving stub_wsgi:app on a free localhost port."""
+
+    def __init__(self, workers):
+        try:
+            import gevent
+            worker_class = ['-k', 'gevent']
+        except ImportError:
+            print('gevent is not installed, the gunicorn workers are sync')
+            worker_class = []
+        s = socket.socket()
+        s.bind(('127.0.0.1', 0))
+        self.port = s.getsockname()[1]
+        s.close()
+        self.process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--chdir', here] + worker_class +
+                                        ['-w', str(workers), '-b', '127.0.0.1:%s' % self.port,
+                                         '--log-level', 'warning', 'stub_wsgi:app'])
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=1)
+                conn.request('GET', '/ping')
+                if conn.getresponse().status == 200:
+                    return
+            except (OSError, http.client.HTTPException):
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError('gunicorn did not start')
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait()
+
+
+def bench_rul_gunicorn(concurrency, rows, requests, server):
+    body = rul_payload(rows)
+    local = threading.local()
+
+    def call():
+        if not hasattr(local, 'conn'):
+            local.conn = http.client.HTTPConnection('127.0.0.1', server.port, timeout=60)
+        local.conn.request('POST', '/invocations', body=body, headers={'Content-Type': 'text/csv'})
+        r = local.conn.getresponse()
+        r.read()
+        if r.status != 200:
+            raise RuntimeError('status %s' % r.status)
+
+    return run_load(call, concurrency, requests)
+
+
+def bench_azure_run(concurrency, rows, requests):
+    # core.py imports azureml.core.model, not needed to score
+    try:
+        import azureml.core.model
+    except ImportError:
+        for name in ['azureml', 'azureml.core', 'azureml.core.model']:
+            sys.modules.setdefault(name, types.ModuleType(name))
+        sys.modules['azureml.core.model'].Model = None
+    if azure_path not in sys.path:
+        sys.path.insert(0, azure_path)
+    import core
+    core.init()
+    body = azure_payload(rows)
+
+    def call():
+        core.run(body)
+
+    return run_load(call, concurrency, requests)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--targets', nargs='+', default=['rul-inprocess', 'rul-gunicorn', 'azure-run'],
+                        choices=['rul-inprocess', 'rul-gunicorn', 'azure-run'])
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 4, 16])
+    parser.add_argument('--rows', nargs='+', type=int, default=[1, 100, 10000], help='rows per request')
+    parser.add_argument('--requests', type=int, default=200, help='requests per run')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers')
+    parser.add_argument('--output', type=str, default=None, help='JSON file of the results')
+    args = parser.parse_args()
+    sys.path.insert(0, here)
+
+    results = []
+    server = Gunicorn(args.workers) if 'rul-gunicorn' in args.targets else None
+    try:
+        for target in args.targets:
+            for rows in args.rows:
+                for concurrency in args.concurrency:
+                    if target == 'rul-inprocess':
+                        out = bench_rul_inprocess(concurrency, rows, args.requests)
+                    elif target == 'rul-gunicorn':
+                        out = bench_rul_gunicorn(concurrency, rows, args.requests, server)
+                    else:
+                        out = bench_azure_run(concurrency, rows, args.requests)
+                    result = summarize(target, concurrency, rows, *out)
+                    results.append(result)
+                    print('%(target)-14s rows=%(rows)-6s c=%(concurrency)-3s p50=%(p50_ms)8.2f ms '
+                          'p95=%(p95_ms)8.2f ms p99=%(p99_ms)8.2f ms %(rows_per_sec)12.0f rows/s '
+                          'errors=%(errors)s' % result)
+    finally:
+        if server is not None:
+            server.stop()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,45 @@
+# The RUL predictor of the SageMaker container with a stub model, for the benchmarks:
+# no SageMaker, no /opt/ml and no TensorFlow are needed.
+#
+# gunicorn --chdir Chapter15/benchmarks -k gevent stub_wsgi:app
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(here, '..', 'aws_sagemaker', 'container', 'rul'))
+
+import predictor
+from backends import NumpyBackend, weights_file
+from scaling import MinMaxScaling
+
+data_path = os.path.join(here, '..', 'aws_sagemaker', 'train_FD001.txt')
+
+
+def stub_weights(path, input_dim=2, seed=7):
+    """rul-model.npz of a dense network 2-16-32-1 with random weights, the shape of the RUL model."""
+    rnd = np.random.RandomState(seed)
+    sizes = [input_dim, 16, 32, 1]
+    arrays = {}
+    for i in range(3):
+        arrays['kernel_%d' % i] = rnd.randn(sizes[i], sizes[i + 1]).astype('float32')
+        arrays['bias_%d' % i] = np.zeros(sizes[i + 1], dtype='float32')
+    np.savez(os.path.join(path, weights_file), activations=np.array(['relu', 'relu', 'sigmoid']), **arrays)
+
+
+def install_stub():
+    path = tempfile.mkdtemp()
+    stub_weights(path, len(predictor.columns_feature))
+    predictor.ScoringService.model = NumpyBackend(path)
+    # the scaling of rul-scaler.json, fitted on the training data as train does
+    train = pd.read_csv(data_path, sep=r'\s+', header=None, names=predictor.columns)
+    predictor.ScoringService.scaling = MinMaxScaling.fit(train, predictor.columns_feature)
+    predictor.ScoringService.timings = {'load_seconds': 0.0, 'warmup_seconds': 0.0}
+
+
+install_stub()
+app = predictor.app